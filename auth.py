@@ -8,6 +8,7 @@ import hashlib
 import hmac
 import time
 import secrets
+from functools import lru_cache
 
 
 # Default PIN for development; override via AUTH_PIN env var
@@ -25,6 +26,22 @@ def _get_secret() -> str:
     return secret
 
 
+@lru_cache(maxsize=1)
+def _get_secret_bytes() -> bytes:
+    """Resolve the signing secret once and keep it encoded for HMAC."""
+    return _get_secret().encode()
+
+
+@lru_cache(maxsize=1024)
+def _signature_valid(payload: str, signature: str) -> bool:
+    """
+    Check a token signature. The SPA sends the same token on every request,
+    so results are memoized; expiry is still checked on each call.
+    """
+    expected_sig = hmac.digest(_get_secret_bytes(), payload.encode(), 'sha256').hex()
+    return hmac.compare_digest(signature, expected_sig)
+
+
 def verify_pin(pin: str) -> bool:
     """
     Check PIN against AUTH_PIN env var.
@@ -32,8 +49,12 @@ def verify_pin(pin: str) -> bool:
     """
     pin_hash_env = os.getenv("APP_PIN_HASH")
     if pin_hash_env:
-        pin_hash = hashlib.sha256(pin.encode()).hexdigest()
-        return hmac.compare_digest(pin_hash, pin_hash_env.lower())
+        try:
+            expected_hash = bytes.fromhex(pin_hash_env)
+        except ValueError:
+            return False
+        pin_hash = hashlib.sha256(pin.encode()).digest()
+        return hmac.compare_digest(pin_hash, expected_hash)
 
     expected_pin = os.getenv("AUTH_PIN") or os.getenv("APP_PIN", DEFAULT_PIN)
     return hmac.compare_digest(pin, expected_pin)
@@ -44,10 +65,10 @@ def create_token() -> str:
     Create an HMAC-signed token with embedded expiration timestamp.
     Format: <expiry_timestamp>.<hmac_signature>
     """
-    secret = _get_secret()
+    secret = _get_secret_bytes()
     expiry = int(time.time()) + TOKEN_EXPIRY_SECONDS
     payload = str(expiry)
-    signature = hmac.new(secret.encode(), payload.encode(), hashlib.sha256).hexdigest()
+    signature = hmac.digest(secret, payload.encode(), 'sha256').hex()
     return f"{payload}.{signature}"
 
 
@@ -63,16 +84,15 @@ def verify_token(token: str) -> bool:
         return False
 
     payload, signature = parts
-    secret = _get_secret()
 
-    # Verify signature
-    expected_sig = hmac.new(secret.encode(), payload.encode(), hashlib.sha256).hexdigest()
-    if not hmac.compare_digest(signature, expected_sig):
-        return False
-
-    # Check expiration
+    # Check expiration first so expired/malformed tokens skip the HMAC.
+    # This only reveals the expiry, which is plaintext in the token anyway.
     try:
         expiry = int(payload)
-        return time.time() < expiry
     except ValueError:
         return False
+    if time.time() >= expiry:
+        return False
+
+    # Verify signature
+    return _signature_valid(payload, signature)
@@ -292,15 +292,23 @@ INSERT INTO categories (name, description, target_budget_percent) VALUES
     ('Cleaning', 'Cleaning supplies, trash bags, detergent', 2.00);
 
 -- Create indexes for common queries
+CREATE INDEX idx_vendors_category ON vendors(category_id);
 CREATE INDEX idx_invoices_vendor ON invoices(vendor_id);
-CREATE INDEX idx_invoices_date ON invoices(invoice_date);
+CREATE INDEX idx_invoices_date_vendor_total ON invoices(invoice_date, vendor_id, total);
 CREATE INDEX idx_invoices_status ON invoices(status);
+CREATE INDEX idx_invoices_vendor_date ON invoices(vendor_id, invoice_date);
+CREATE INDEX idx_invoices_status_date ON invoices(status, invoice_date);
+CREATE INDEX idx_invoices_status_due ON invoices(status, due_date);
 CREATE INDEX idx_invoice_items_invoice ON invoice_items(invoice_id);
 CREATE INDEX idx_products_normalized ON products(normalized_name);
+CREATE INDEX idx_products_category ON products(category_id);
 CREATE INDEX idx_daily_sales_date ON daily_sales(sale_date);
 CREATE INDEX idx_price_alerts_unack ON price_alerts(is_acknowledged) WHERE NOT is_acknowledged;
+CREATE INDEX idx_price_alerts_vendor_created ON price_alerts(vendor_id, created_at);
 CREATE INDEX idx_pvp_product_date ON product_vendor_prices(product_id, invoice_date);
 CREATE INDEX idx_pvp_vendor_product ON product_vendor_prices(vendor_id, product_id);
+CREATE INDEX idx_pvp_vendor_date ON product_vendor_prices(vendor_id, invoice_date);
+CREATE INDEX idx_pvp_date_product ON product_vendor_prices(invoice_date, product_id);
 CREATE INDEX idx_cp_store_product ON competitor_prices(store_id, normalized_name);
 CREATE INDEX idx_ocr_original ON ocr_corrections(original_text);
 CREATE INDEX idx_contract_vendor_product ON price_contracts(vendor_id, product_id);
@@ -4,20 +4,27 @@ Apple Tree Purchase Tracker - FastAPI Backend
 
 import os
 import io
+import asyncio
 import csv
-import shutil
+import hashlib
+import re
+import sqlite3
+import time
+import uuid
+from collections import defaultdict
 from datetime import datetime, date, timedelta
 from decimal import Decimal
 from typing import Optional, List
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, Depends, Query, Request
+from fastapi import FastAPI, HTTPException, UploadFile, File, Depends, Query, Request, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse, StreamingResponse, FileResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from pydantic import BaseModel, Field
-from sqlalchemy import create_engine, func, extract, desc, case, text
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy import create_engine, event, func, extract, desc, case, text, update, insert, select
+from sqlalchemy.orm import sessionmaker, Session, contains_eager, joinedload, selectinload, undefer
 
 from models import (
     Base, Category, Vendor, Invoice, InvoiceItem,
@@ -36,40 +43,94 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 BACKUP_DIR = Path("./backups")
 BACKUP_DIR.mkdir(exist_ok=True)
 
-# Auto-backup: copy DB before doing anything (protects against corruption)
-def _backup_database():
-    db_path = Path("./purchase_tracker.db")
-    if db_path.exists() and db_path.stat().st_size > 0:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_path = BACKUP_DIR / f"purchase_tracker_{timestamp}.db"
-        shutil.copy2(str(db_path), str(backup_path))
-        # Keep only last 10 backups
-        backups = sorted(BACKUP_DIR.glob("purchase_tracker_*.db"))
-        for old in backups[:-10]:
-            old.unlink()
-        print(f"Database backed up to {backup_path}")
+SQLITE_DB_PATH = Path("./purchase_tracker.db")
+BACKUP_INTERVAL = 3600  # seconds
+MAX_BACKUPS = 10
 
-if "sqlite" in DATABASE_URL:
-    _backup_database()
+
+def _snapshot_database(backup_path: Path):
+    """Copy the live DB with SQLite's online backup API (consistent even with an un-checkpointed WAL)."""
+    src = sqlite3.connect(str(SQLITE_DB_PATH))
+    try:
+        dst = sqlite3.connect(str(backup_path))
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+    finally:
+        src.close()
+
+
+_last_backup_version = None
+
+
+# Auto-backup: snapshot the DB at startup and hourly (protects against corruption).
+# Startup snapshots rotate separately so frequent restarts don't push out the
+# hourly ones, and an hourly snapshot is skipped if nothing was committed since
+# the previous snapshot.
+def _backup_database(startup: bool = False):
+    global _last_backup_version
+    if not SQLITE_DB_PATH.exists() or SQLITE_DB_PATH.stat().st_size == 0:
+        return
+    version = _data_version
+    if not startup and version == _last_backup_version:
+        return
+    prefix = "purchase_tracker_startup_" if startup else "purchase_tracker_"
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    backup_path = BACKUP_DIR / f"{prefix}{timestamp}.db"
+    _snapshot_database(backup_path)
+    _last_backup_version = version
+    # Keep only the last 10 backups of each kind
+    backups = sorted(BACKUP_DIR.glob(f"{prefix}[0-9]*.db"))
+    for old in backups[:-MAX_BACKUPS]:
+        old.unlink()
+    print(f"Database backed up to {backup_path}")
 
 # Database setup
 connect_args = {}
+engine_kwargs = {}
 if "sqlite" in DATABASE_URL:
     connect_args["check_same_thread"] = False
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+else:
+    # Size the pool for the threadpool workers and drop dead server connections
+    engine_kwargs.update(
+        pool_size=int(os.getenv("DB_POOL_SIZE", "20")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        pool_timeout=30,
+        pool_pre_ping=True,
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+    )
+engine = create_engine(DATABASE_URL, connect_args=connect_args, **engine_kwargs)
 
 # Enable WAL mode for SQLite (crash-resilient, survives power loss)
 if "sqlite" in DATABASE_URL:
-    from sqlalchemy import event
     @event.listens_for(engine, "connect")
     def _set_sqlite_pragma(dbapi_conn, connection_record):
         cursor = dbapi_conn.cursor()
         cursor.execute("PRAGMA journal_mode=WAL")
         cursor.execute("PRAGMA synchronous=NORMAL")
+        # Wait on locks instead of failing, and keep hot pages in memory
+        cursor.execute("PRAGMA busy_timeout=30000")
+        cursor.execute("PRAGMA cache_size=-64000")  # 64 MB
+        cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        cursor.execute("PRAGMA temp_store=MEMORY")
         cursor.close()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# SQLite allows a single writer. Mutating endpoints use a one-connection engine,
+# so concurrent writes queue on its pool instead of fighting over the file lock
+# while reads keep using the main pool.
+if "sqlite" in DATABASE_URL:
+    write_engine = create_engine(
+        DATABASE_URL, connect_args=connect_args,
+        pool_size=1, max_overflow=0, pool_timeout=60,
+    )
+    event.listen(write_engine, "connect", _set_sqlite_pragma)
+else:
+    write_engine = engine
+WriteSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=write_engine)
+
 # Create tables
 Base.metadata.create_all(bind=engine)
 
@@ -104,6 +165,96 @@ if not ANTHROPIC_API_KEY:
 
 ocr_processor = InvoiceOCRProcessor()
 
+# Bound concurrent Claude Vision calls across requests to stay under API rate limits
+OCR_CONCURRENCY = int(os.getenv("OCR_CONCURRENCY", "4"))
+_ocr_semaphore = asyncio.Semaphore(OCR_CONCURRENCY)
+
+
+async def _run_ocr(func, *args):
+    async with _ocr_semaphore:
+        return await run_in_threadpool(func, *args)
+
+
+# ==================== HTTP CACHING ====================
+
+# Dashboard/analytics responses only change when something is committed (or the
+# date rolls over), so they get an ETag built from a commit counter and the date.
+# Browsers revalidate every time (no-cache) and unchanged data costs a 304 with
+# no database work. The counter is per process; the random tag keeps another
+# process's ETags from ever matching.
+CACHEABLE_PREFIXES = ("/api/dashboard/", "/api/analytics/")
+_PROCESS_TAG = uuid.uuid4().hex[:8]
+_data_version = 0
+
+
+# Only commits that actually wrote something bump the version, so an empty
+# commit leaves ETags and cached responses valid.
+@event.listens_for(Session, "after_flush")
+def _mark_flushed(session, flush_context):
+    session.info["data_changed"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_bulk_write(orm_execute_state):
+    # Bulk insert/update/delete statements bypass the flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["data_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_data_version(session):
+    global _data_version
+    if session.info.pop("data_changed", False):
+        _data_version += 1
+
+
+@event.listens_for(Session, "after_rollback")
+def _clear_data_changed(session):
+    session.info.pop("data_changed", None)
+
+
+@app.middleware("http")
+async def etag_middleware(request: Request, call_next):
+    if request.method != "GET" or not request.url.path.startswith(CACHEABLE_PREFIXES):
+        return await call_next(request)
+
+    # Read the version before the handler runs so a concurrent commit can only
+    # make the tag stale-looking (a refetch), never serve stale data
+    etag = f'W/"{_PROCESS_TAG}-{_data_version}-{date.today().isoformat()}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+_response_cache: dict = {}
+_response_cache_version = None
+
+
+def _cached_response(key: str, build):
+    """
+    Reuse an endpoint's computed result until the next commit or date change.
+    For aggregate endpoints with no per-user input; callers must not mutate the result.
+    """
+    global _response_cache_version
+    version = (_data_version, date.today())
+    # Drop every entry once the version moves on, so parameterised keys don't pile up
+    if version != _response_cache_version:
+        _response_cache.clear()
+        _response_cache_version = version
+    cached = _response_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    result = build()
+    # Empty results are cheap to rebuild; not caching them keeps unknown ids out
+    if result:
+        _response_cache[key] = (version, result)
+    return result
+
 
 # ==================== AUTH MIDDLEWARE ====================
 
@@ -138,6 +289,14 @@ def get_db():
         db.close()
 
 
+def get_write_db():
+    db = WriteSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
 # ==================== PYDANTIC MODELS ====================
 
 class PinLogin(BaseModel):
@@ -290,10 +449,11 @@ def list_categories(db: Session = Depends(get_db)):
     return db.query(Category).all()
 
 @app.post("/api/categories", response_model=CategoryResponse)
-def create_category(category: CategoryCreate, db: Session = Depends(get_db)):
+def create_category(category: CategoryCreate, db: Session = Depends(get_write_db)):
     db_category = Category(**category.dict())
     db.add(db_category)
     db.commit()
+    invalidate_category_cache()
     db.refresh(db_category)
     return db_category
 
@@ -321,7 +481,7 @@ def get_category(category_id: int, db: Session = Depends(get_db)):
 
 
 @app.put("/api/categories/{category_id}")
-def update_category(category_id: int, data: CategoryCreate, db: Session = Depends(get_db)):
+def update_category(category_id: int, data: CategoryCreate, db: Session = Depends(get_write_db)):
     category = db.query(Category).filter(Category.id == category_id).first()
     if not category:
         raise HTTPException(status_code=404, detail="Category not found")
@@ -331,6 +491,7 @@ def update_category(category_id: int, data: CategoryCreate, db: Session = Depend
     if data.target_budget_percent is not None:
         category.target_budget_percent = data.target_budget_percent
     db.commit()
+    invalidate_category_cache()
     db.refresh(category)
     return {"id": category.id, "name": category.name, "description": category.description}
 
@@ -338,18 +499,20 @@ def update_category(category_id: int, data: CategoryCreate, db: Session = Depend
 @app.get("/api/categories/with-products")
 def categories_with_products(db: Session = Depends(get_db)):
     """Categories with product counts and uncategorized count."""
-    cats = db.query(Category).all()
-    result = []
-    for cat in cats:
-        count = db.query(func.count(Product.id)).filter(Product.category_id == cat.id).scalar() or 0
-        result.append({
+    counts = dict(
+        db.query(Product.category_id, func.count(Product.id))
+        .group_by(Product.category_id).all()
+    )
+    result = [
+        {
             "id": cat.id,
             "name": cat.name,
             "description": cat.description,
-            "product_count": count,
-        })
-    uncategorized = db.query(func.count(Product.id)).filter(Product.category_id == None).scalar() or 0
-    return {"categories": result, "uncategorized_count": uncategorized}
+            "product_count": counts.get(cat.id, 0),
+        }
+        for cat in db.query(Category).all()
+    ]
+    return {"categories": result, "uncategorized_count": counts.get(None, 0)}
 
 
 @app.get("/api/products/uncategorized")
@@ -363,7 +526,7 @@ def uncategorized_products(limit: int = 50, db: Session = Depends(get_db)):
 
 
 @app.put("/api/products/{product_id}/category")
-def set_product_category(product_id: int, category_id: int, db: Session = Depends(get_db)):
+def set_product_category(product_id: int, category_id: int, db: Session = Depends(get_write_db)):
     """Manually assign a category to a product."""
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
@@ -377,20 +540,26 @@ class BulkCategorizeRequest(BaseModel):
     assignments: List[dict]  # [{product_id: int, category_id: int}]
 
 @app.put("/api/products/bulk-categorize")
-def bulk_categorize_products(data: BulkCategorizeRequest, db: Session = Depends(get_db)):
+def bulk_categorize_products(data: BulkCategorizeRequest, db: Session = Depends(get_write_db)):
     """Batch assign categories to products."""
+    # Last assignment per product wins, then one UPDATE per target category
+    targets = {entry.get('product_id'): entry.get('category_id') for entry in data.assignments}
+    by_category = defaultdict(list)
+    for product_id, category_id in targets.items():
+        by_category[category_id].append(product_id)
+
     updated = 0
-    for entry in data.assignments:
-        product = db.query(Product).filter(Product.id == entry.get('product_id')).first()
-        if product:
-            product.category_id = entry.get('category_id')
-            updated += 1
+    for category_id, product_ids in by_category.items():
+        updated += db.execute(
+            update(Product).where(Product.id.in_(product_ids)).values(category_id=category_id),
+            execution_options={"synchronize_session": False},
+        ).rowcount
     db.commit()
     return {"message": f"Updated {updated} products"}
 
 
 @app.post("/api/admin/seed-categories")
-def seed_additional_categories(db: Session = Depends(get_db)):
+def seed_additional_categories(db: Session = Depends(get_write_db)):
     """Add missing default categories to existing databases."""
     new_cats = [
         ("Snacks/Chips", "Chips, pretzels, crackers, snack foods", 5.0),
@@ -405,6 +574,7 @@ def seed_additional_categories(db: Session = Depends(get_db)):
             db.add(Category(name=name, description=desc, target_budget_percent=pct))
             added += 1
     db.commit()
+    invalidate_category_cache()
     return {"message": f"Added {added} new categories"}
 
 
@@ -426,15 +596,51 @@ CATEGORY_KEYWORDS = {
 }
 
 
+# One compiled alternation per category, kept in CATEGORY_KEYWORDS order so the
+# first matching category still wins.
+_CATEGORY_PATTERNS = [
+    (cat_name, re.compile("|".join(re.escape(k) for k in keywords)))
+    for cat_name, keywords in CATEGORY_KEYWORDS.items()
+]
+
+# Category id <-> name maps, loaded on first use and dropped whenever categories change
+_category_names: Optional[dict] = None
+_category_ids: Optional[dict] = None
+
+
+def _load_category_maps(db: Session):
+    global _category_names, _category_ids
+    if _category_names is None:
+        rows = db.query(Category.id, Category.name).all()
+        _category_names = dict(rows)
+        _category_ids = {name: cat_id for cat_id, name in rows}
+
+
+def _get_category_ids(db: Session) -> dict:
+    """Category name -> id."""
+    _load_category_maps(db)
+    return _category_ids
+
+
+def _get_category_names(db: Session) -> dict:
+    """Category id -> name."""
+    _load_category_maps(db)
+    return _category_names
+
+
+def invalidate_category_cache():
+    global _category_names, _category_ids
+    _category_names = None
+    _category_ids = None
+
+
 def auto_categorize_product(product_name: str, db: Session) -> Optional[int]:
     """Match product name to a category using keyword lookup."""
     name_lower = product_name.lower()
-    for cat_name, keywords in CATEGORY_KEYWORDS.items():
-        for keyword in keywords:
-            if keyword in name_lower:
-                category = db.query(Category).filter(Category.name == cat_name).first()
-                if category:
-                    return category.id
+    category_ids = _get_category_ids(db)
+    for cat_name, pattern in _CATEGORY_PATTERNS:
+        if cat_name in category_ids and pattern.search(name_lower):
+            return category_ids[cat_name]
     return None
 
 
@@ -446,7 +652,7 @@ def list_vendors(
     active_only: bool = True,
     db: Session = Depends(get_db)
 ):
-    query = db.query(Vendor)
+    query = db.query(Vendor).options(joinedload(Vendor.category))
     if category_id:
         query = query.filter(Vendor.category_id == category_id)
     if active_only:
@@ -455,7 +661,7 @@ def list_vendors(
     return [v.to_dict() for v in vendors]
 
 @app.post("/api/vendors")
-def create_vendor(vendor: VendorCreate, db: Session = Depends(get_db)):
+def create_vendor(vendor: VendorCreate, db: Session = Depends(get_write_db)):
     db_vendor = Vendor(**vendor.dict())
     db.add(db_vendor)
     db.commit()
@@ -464,11 +670,11 @@ def create_vendor(vendor: VendorCreate, db: Session = Depends(get_db)):
 
 @app.get("/api/vendors/{vendor_id}")
 def get_vendor(vendor_id: int, db: Session = Depends(get_db)):
-    vendor = db.query(Vendor).filter(Vendor.id == vendor_id).first()
+    vendor = db.query(Vendor).options(joinedload(Vendor.category)).filter(Vendor.id == vendor_id).first()
     if not vendor:
         raise HTTPException(status_code=404, detail="Vendor not found")
 
-    recent_invoices = db.query(Invoice).filter(
+    recent_invoices = db.query(Invoice).options(undefer(Invoice.item_count)).filter(
         Invoice.vendor_id == vendor_id
     ).order_by(Invoice.invoice_date.desc()).limit(10).all()
 
@@ -488,7 +694,7 @@ def get_vendor(vendor_id: int, db: Session = Depends(get_db)):
     }
 
 @app.put("/api/vendors/{vendor_id}")
-def update_vendor(vendor_id: int, vendor: VendorCreate, db: Session = Depends(get_db)):
+def update_vendor(vendor_id: int, vendor: VendorCreate, db: Session = Depends(get_write_db)):
     db_vendor = db.query(Vendor).filter(Vendor.id == vendor_id).first()
     if not db_vendor:
         raise HTTPException(status_code=404, detail="Vendor not found")
@@ -514,7 +720,7 @@ def list_invoices(
     offset: int = 0,
     db: Session = Depends(get_db)
 ):
-    query = db.query(Invoice).join(Vendor)
+    query = db.query(Invoice).join(Invoice.vendor)
 
     if vendor_id:
         query = query.filter(Invoice.vendor_id == vendor_id)
@@ -527,16 +733,31 @@ def list_invoices(
     if status:
         query = query.filter(Invoice.status == status)
 
-    total = query.count()
-    invoices = query.order_by(Invoice.invoice_date.desc()).offset(offset).limit(limit).all()
+    # Total filtered count rides along on each row as a window aggregate,
+    # instead of a separate COUNT(*) over the same filters
+    # Reuse the filter join to populate Invoice.vendor instead of joining vendors twice;
+    # to_dict() also reads the vendor's category and item count
+    rows = query.options(
+        contains_eager(Invoice.vendor).joinedload(Vendor.category), undefer(Invoice.item_count)
+    ).add_columns(func.count().over().label('total')
+    ).order_by(Invoice.invoice_date.desc()).offset(offset).limit(limit).all()
+    if rows:
+        total = rows[0].total
+    else:
+        # A page past the end returns no rows to read the total from
+        total = query.count() if offset else 0
 
     return {
         "total": total,
-        "invoices": [inv.to_dict() for inv in invoices]
+        "invoices": [inv.to_dict() for inv, _ in rows]
     }
 
 @app.post("/api/invoices")
-def create_invoice(invoice: InvoiceCreate, db: Session = Depends(get_db)):
+def create_invoice(
+    invoice: InvoiceCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_write_db)
+):
     vendor = db.query(Vendor).filter(Vendor.id == invoice.vendor_id).first()
     if not vendor:
         raise HTTPException(status_code=404, detail="Vendor not found")
@@ -584,8 +805,10 @@ def create_invoice(invoice: InvoiceCreate, db: Session = Depends(get_db)):
     db.add(db_invoice)
     db.flush()
 
-    for item in invoice.items:
-        db_item = InvoiceItem(
+    # Insert all line items in one batched flush (one multi-row INSERT ... RETURNING
+    # instead of a flush per item), then update the catalog with the new item ids.
+    db_items = [
+        InvoiceItem(
             invoice_id=db_invoice.id,
             product_name=item.product_name,
             quantity=item.quantity,
@@ -595,33 +818,74 @@ def create_invoice(invoice: InvoiceCreate, db: Session = Depends(get_db)):
             product_code=item.product_code,
             category_override=item.category_override,
         )
-        db.add(db_item)
-        db.flush()
+        for item in invoice.items
+    ]
+    db.add_all(db_items)
+    db.flush()
 
-        _update_product_catalog(db, item, vendor.id, invoice.invoice_date, db_item.id)
+    # Look up the invoice's products and the vendor's active contracts once
+    # rather than per line item (first match wins, as with .first() before)
+    names = {item.product_name.lower().strip() for item in invoice.items}
+    products = {}
+    if names:
+        for product in db.query(Product).filter(Product.normalized_name.in_(names)).order_by(Product.id):
+            products.setdefault(product.normalized_name, product)
+    contracts = {}
+    for contract in db.query(PriceContract).filter(
+        PriceContract.vendor_id == vendor.id,
+        PriceContract.is_active == True,
+        PriceContract.start_date <= invoice.invoice_date,
+        PriceContract.end_date >= invoice.invoice_date,
+    ).order_by(PriceContract.id):
+        contracts.setdefault(contract.product_id, contract)
+
+    touched = [
+        _update_product_catalog(
+            db, item, vendor.id, invoice.invoice_date, db_item.id,
+            products=products, contracts=contracts,
+        )
+        for item, db_item in zip(invoice.items, db_items)
+    ]
+    # One flush writes new products, then price rows and alerts, as batched INSERTs
+    db.flush()
+    _refresh_avg_prices(db, {product.id for product in touched})
 
     db.commit()
     db.refresh(db_invoice)
+    result = db_invoice.to_dict(include_items=True)
+
+    # Auto-generate recommendations after the response is sent. Release this
+    # session first: on SQLite the task needs the single writer connection.
+    db.close()
+    background_tasks.add_task(_generate_recommendations)
+
+    return result
 
-    # Auto-generate recommendations after invoice save
+
+def _generate_recommendations():
+    """Refresh recommendations in a session of its own (runs as a background task)."""
+    db = WriteSessionLocal()
     try:
         from recommendations import RecommendationEngine
         engine = RecommendationEngine(db)
         engine.generate_all()
     except Exception as e:
         print(f"Recommendation generation error: {e}")
-
-    return db_invoice.to_dict(include_items=True)
+    finally:
+        db.close()
 
 @app.get("/api/invoices/{invoice_id}")
 def get_invoice(invoice_id: int, db: Session = Depends(get_db)):
-    invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
+    invoice = db.query(Invoice).options(
+        joinedload(Invoice.vendor).joinedload(Vendor.category), selectinload(Invoice.items),
+        undefer(Invoice.item_count)
+    ).filter(Invoice.id == invoice_id).first()
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
     return invoice.to_dict(include_items=True)
 
 @app.put("/api/invoices/{invoice_id}/status")
-def update_invoice_status(invoice_id: int, status: str, db: Session = Depends(get_db)):
+def update_invoice_status(invoice_id: int, status: str, db: Session = Depends(get_write_db)):
     valid_statuses = ['pending', 'verified', 'paid', 'disputed']
     if status not in valid_statuses:
         raise HTTPException(status_code=400, detail=f"Invalid status. Must be one of: {valid_statuses}")
@@ -638,7 +902,7 @@ def update_invoice_status(invoice_id: int, status: str, db: Session = Depends(ge
     return invoice.to_dict()
 
 @app.delete("/api/invoices/{invoice_id}")
-def delete_invoice(invoice_id: int, db: Session = Depends(get_db)):
+def delete_invoice(invoice_id: int, db: Session = Depends(get_write_db)):
     invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
@@ -650,38 +914,14 @@ def delete_invoice(invoice_id: int, db: Session = Depends(get_db)):
 
 # ==================== OCR ENDPOINTS ====================
 
-@app.post("/api/ocr/process", response_model=OCRResultResponse)
-async def process_invoice_image(
-    file: UploadFile = File(...),
-    db: Session = Depends(get_db)
-):
-    allowed_types = ['image/jpeg', 'image/png', 'image/jpg', 'application/pdf']
-    if file.content_type not in allowed_types:
-        raise HTTPException(status_code=400, detail=f"File type not allowed. Must be: {allowed_types}")
-
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{timestamp}_{file.filename}"
-    file_path = UPLOAD_DIR / filename
-
-    with open(file_path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
-
-    try:
-        result = ocr_processor.process_image(str(file_path))
-    except Exception as e:
-        return OCRResultResponse(
-            vendor_name=None, vendor_address=None, vendor_phone=None,
-            vendor_email=None, invoice_number=None, invoice_date=None,
-            total=None, line_items=[], confidence_score=0.0, suggested_vendor_id=None
-        )
-
+def _build_ocr_response(db: Session, result: ExtractedInvoice) -> OCRResultResponse:
+    """Match the OCR vendor, apply learned corrections and build the API response."""
     suggested_vendor_id = None
     if result.vendor_name:
-        vendor = db.query(Vendor).filter(
+        # Only the id is needed; skip loading the Vendor (and its joined category)
+        suggested_vendor_id = db.query(Vendor.id).filter(
             Vendor.name.ilike(f"%{result.vendor_name}%")
-        ).first()
-        if vendor:
-            suggested_vendor_id = vendor.id
+        ).limit(1).scalar()
 
     line_items = [{
         'product_name': item.product_name,
@@ -707,6 +947,43 @@ async def process_invoice_image(
     )
 
 
+def _upload_path(filename: Optional[str]) -> Path:
+    """
+    Unique path for an uploaded file. Pages uploaded in the same second used to
+    share a timestamp and overwrite each other; client-supplied directories are dropped.
+    """
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return UPLOAD_DIR / f"{timestamp}_{uuid.uuid4().hex[:8]}_{Path(filename or 'upload').name}"
+
+
+@app.post("/api/ocr/process", response_model=OCRResultResponse)
+async def process_invoice_image(
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db)
+):
+    allowed_types = ['image/jpeg', 'image/png', 'image/jpg', 'application/pdf']
+    if file.content_type not in allowed_types:
+        raise HTTPException(status_code=400, detail=f"File type not allowed. Must be: {allowed_types}")
+
+    file_path = _upload_path(file.filename)
+
+    # OCR needs the whole image in memory anyway; only the disk write is moved off the loop
+    content = await file.read()
+    await run_in_threadpool(file_path.write_bytes, content)
+
+    # The vision call and DB lookups are blocking; keep them off the event loop
+    try:
+        result = await _run_ocr(ocr_processor.process_image_bytes, content, file.filename)
+    except Exception as e:
+        return OCRResultResponse(
+            vendor_name=None, vendor_address=None, vendor_phone=None,
+            vendor_email=None, invoice_number=None, invoice_date=None,
+            total=None, line_items=[], confidence_score=0.0, suggested_vendor_id=None
+        )
+
+    return await run_in_threadpool(_build_ocr_response, db, result)
+
+
 @app.post("/api/ocr/process-multi", response_model=OCRResultResponse)
 async def process_multi_invoice_images(
     files: List[UploadFile] = File(...),
@@ -721,17 +998,14 @@ async def process_multi_invoice_images(
     for f in files:
         if f.content_type not in allowed_types:
             raise HTTPException(status_code=400, detail=f"File type not allowed: {f.content_type}")
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{timestamp}_{f.filename}"
-        file_path = UPLOAD_DIR / filename
+        file_path = _upload_path(f.filename)
         content = await f.read()
-        with open(file_path, "wb") as out:
-            out.write(content)
+        await run_in_threadpool(file_path.write_bytes, content)
         suffix = Path(f.filename).suffix.lower() if f.filename else '.jpg'
         images.append((content, suffix))
 
     try:
-        result = ocr_processor.process_multiple_images(images)
+        result = await _run_ocr(ocr_processor.process_multiple_images, images)
     except Exception as e:
         return OCRResultResponse(
             vendor_name=None, vendor_address=None, vendor_phone=None,
@@ -739,65 +1013,39 @@ async def process_multi_invoice_images(
             total=None, line_items=[], confidence_score=0.0, suggested_vendor_id=None
         )
 
-    suggested_vendor_id = None
-    if result.vendor_name:
-        vendor = db.query(Vendor).filter(
-            Vendor.name.ilike(f"%{result.vendor_name}%")
-        ).first()
-        if vendor:
-            suggested_vendor_id = vendor.id
-
-    line_items = [{
-        'product_name': item.product_name,
-        'quantity': item.quantity,
-        'unit_price': item.unit_price,
-        'total_price': item.total_price
-    } for item in result.line_items]
-
-    line_items = apply_ocr_corrections(db, line_items)
-
-    return OCRResultResponse(
-        vendor_name=result.vendor_name,
-        vendor_address=result.vendor_address,
-        vendor_phone=result.vendor_phone,
-        vendor_email=result.vendor_email,
-        invoice_number=result.invoice_number,
-        invoice_date=result.invoice_date,
-        total=result.total,
-        line_items=line_items,
-        confidence_score=result.confidence_score,
-        suggested_vendor_id=suggested_vendor_id
-    )
+    return await run_in_threadpool(_build_ocr_response, db, result)
 
 
 # ==================== DASHBOARD/ANALYTICS ENDPOINTS ====================
 
 @app.get("/api/dashboard/summary")
 def get_dashboard_summary(db: Session = Depends(get_db)):
+    return _cached_response("dashboard_summary", lambda: _dashboard_summary(db))
+
+
+def _dashboard_summary(db: Session):
     now = datetime.now()
     today = date.today()
     month_start = date(now.year, now.month, 1)
     week_start = today - timedelta(days=today.weekday())
 
-    today_total = db.query(func.sum(Invoice.total)).filter(
-        Invoice.invoice_date == today
-    ).scalar() or 0
-
-    week_total = db.query(func.sum(Invoice.total)).filter(
-        Invoice.invoice_date >= week_start
-    ).scalar() or 0
-
-    month_total = db.query(func.sum(Invoice.total)).filter(
-        Invoice.invoice_date >= month_start
-    ).scalar() or 0
-
-    pending_count = db.query(func.count(Invoice.id)).filter(
-        Invoice.status == 'pending'
-    ).scalar() or 0
+    # Today/week/month totals and the pending count in one pass over invoices
+    totals = db.query(
+        func.sum(case((Invoice.invoice_date == today, Invoice.total), else_=0)).label('today'),
+        func.sum(case((Invoice.invoice_date >= week_start, Invoice.total), else_=0)).label('week'),
+        func.sum(case((Invoice.invoice_date >= month_start, Invoice.total), else_=0)).label('month'),
+        func.count(case((Invoice.status == 'pending', Invoice.id))).label('pending'),
+    ).filter(
+        (Invoice.invoice_date >= min(week_start, month_start)) | (Invoice.status == 'pending')
+    ).one()
+    today_total = totals.today or 0
+    week_total = totals.week or 0
+    month_total = totals.month or 0
+    pending_count = totals.pending or 0
 
-    recent_invoices = db.query(Invoice).order_by(
-        Invoice.created_at.desc()
-    ).limit(5).all()
+    recent_invoices = db.query(Invoice).options(
+        joinedload(Invoice.vendor).joinedload(Vendor.category), undefer(Invoice.item_count)
+    ).order_by(Invoice.created_at.desc()).limit(5).all()
 
     category_spending = db.query(
         Category.name,
@@ -821,9 +1069,14 @@ def get_dashboard_summary(db: Session = Depends(get_db)):
 
 @app.get("/api/dashboard/spending-trend")
 def get_spending_trend(
-    days: int = Query(default=30, le=365),
+    days: int = Query(default=30, ge=1, le=365),
     db: Session = Depends(get_db)
 ):
+    # Rows are already plain JSON types; skip jsonable_encoder's per-value walk
+    return JSONResponse(_cached_response(f"spending_trend:{days}", lambda: _spending_trend(days, db)))
+
+
+def _spending_trend(days: int, db: Session):
     start_date = date.today() - timedelta(days=days)
 
     daily_spending = db.query(
@@ -845,6 +1098,13 @@ def get_category_breakdown(
     end_date: Optional[date] = None,
     db: Session = Depends(get_db)
 ):
+    if start_date is None and end_date is None:
+        # The dashboard's default month-to-date view is shared by every client
+        return _cached_response("category_breakdown", lambda: _category_breakdown(None, None, db))
+    return _category_breakdown(start_date, end_date, db)
+
+
+def _category_breakdown(start_date: Optional[date], end_date: Optional[date], db: Session):
     if not start_date:
         start_date = date.today().replace(day=1)
     if not end_date:
@@ -876,6 +1136,10 @@ def get_category_breakdown(
 
 @app.get("/api/dashboard/budget-status")
 def get_budget_status(db: Session = Depends(get_db)):
+    return _cached_response("budget_status", lambda: _budget_status(db))
+
+
+def _budget_status(db: Session):
     now = datetime.now()
     month_start = date(now.year, now.month, 1)
 
@@ -927,6 +1191,17 @@ def analytics_products(
     """Products sorted by spend, volume, or price change."""
     cutoff_90 = date.today() - timedelta(days=90)
 
+    # Aggregate the 90-day window once per product (an invoice_date range scan),
+    # then attach it 1:1, so products without recent prices keep zero totals
+    recent = db.query(
+        ProductVendorPrice.product_id,
+        func.sum(ProductVendorPrice.quantity).label('total_volume'),
+        func.sum(ProductVendorPrice.unit_price * ProductVendorPrice.quantity).label('total_spend'),
+        func.count(func.distinct(ProductVendorPrice.vendor_id)).label('vendor_count'),
+    ).filter(
+        ProductVendorPrice.invoice_date >= cutoff_90
+    ).group_by(ProductVendorPrice.product_id).subquery()
+
     query = db.query(
         Product.id,
         Product.name,
@@ -938,32 +1213,28 @@ def analytics_products(
         Product.units_per_case,
         Product.target_margin,
         Product.category_id,
-        func.sum(ProductVendorPrice.quantity).label('total_volume'),
-        func.sum(ProductVendorPrice.unit_price * ProductVendorPrice.quantity).label('total_spend'),
-        func.count(func.distinct(ProductVendorPrice.vendor_id)).label('vendor_count'),
-    ).outerjoin(ProductVendorPrice, ProductVendorPrice.product_id == Product.id
-    ).filter(
-        (ProductVendorPrice.invoice_date >= cutoff_90) | (ProductVendorPrice.id == None)
-    )
+        recent.c.total_volume,
+        recent.c.total_spend,
+        recent.c.vendor_count,
+    ).outerjoin(recent, recent.c.product_id == Product.id)
 
     if search:
         query = query.filter(Product.name.ilike(f"%{search}%"))
 
-    query = query.group_by(Product.id)
-
     if sort_by == "spend":
-        query = query.order_by(desc(func.sum(ProductVendorPrice.unit_price * ProductVendorPrice.quantity)))
+        query = query.order_by(desc(recent.c.total_spend))
     elif sort_by == "volume":
-        query = query.order_by(desc(func.sum(ProductVendorPrice.quantity)))
+        query = query.order_by(desc(recent.c.total_volume))
     else:
         query = query.order_by(desc(Product.max_price - Product.min_price))
 
     rows = query.limit(limit).all()
 
-    # Build category name lookup
-    cat_map = {c.id: c.name for c in db.query(Category).all()}
+    cat_map = _get_category_names(db)
 
-    return [
+    # Every value below is already a JSON type, so hand the list straight to
+    # JSONResponse rather than through jsonable_encoder
+    return JSONResponse([
         {
             "id": r.id,
             "name": r.name,
@@ -981,7 +1252,7 @@ def analytics_products(
             "vendor_count": r.vendor_count or 0,
         }
         for r in rows
-    ]
+    ])
 
 @app.get("/api/analytics/products/{product_id}/price-history")
 def product_price_history(product_id: int, days: int = 90, db: Session = Depends(get_db)):
@@ -1000,7 +1271,7 @@ def product_price_history(product_id: int, days: int = 90, db: Session = Depends
         ProductVendorPrice.invoice_date >= cutoff,
     ).order_by(ProductVendorPrice.invoice_date).all()
 
-    return [
+    return JSONResponse([
         {
             "date": r.invoice_date.isoformat(),
             "price": float(r.unit_price),
@@ -1009,7 +1280,7 @@ def product_price_history(product_id: int, days: int = 90, db: Session = Depends
             "vendor_name": r.vendor_name,
         }
         for r in rows
-    ]
+    ])
 
 @app.get("/api/analytics/products/{product_id}/vendors")
 def product_vendors(product_id: int, db: Session = Depends(get_db)):
@@ -1029,7 +1300,7 @@ def product_vendors(product_id: int, db: Session = Depends(get_db)):
         ProductVendorPrice.invoice_date >= cutoff,
     ).group_by(Vendor.id).order_by(func.avg(ProductVendorPrice.unit_price)).all()
 
-    return [
+    return JSONResponse([
         {
             "vendor_id": r.id,
             "vendor_name": r.name,
@@ -1039,7 +1310,7 @@ def product_vendors(product_id: int, db: Session = Depends(get_db)):
             "purchase_count": r.purchase_count,
         }
         for r in rows
-    ]
+    ])
 
 @app.get("/api/analytics/volume-trends")
 def volume_trends(limit: int = 20, db: Session = Depends(get_db)):
@@ -1047,59 +1318,80 @@ def volume_trends(limit: int = 20, db: Session = Depends(get_db)):
     recent_cutoff = date.today() - timedelta(days=30)
     prev_cutoff = date.today() - timedelta(days=60)
 
-    recent = db.query(
-        ProductVendorPrice.product_id,
-        func.sum(ProductVendorPrice.quantity).label('recent_vol'),
-    ).filter(
-        ProductVendorPrice.invoice_date >= recent_cutoff,
-    ).group_by(ProductVendorPrice.product_id).subquery()
-
-    previous = db.query(
-        ProductVendorPrice.product_id,
-        func.sum(ProductVendorPrice.quantity).label('prev_vol'),
-    ).filter(
-        ProductVendorPrice.invoice_date >= prev_cutoff,
-        ProductVendorPrice.invoice_date < recent_cutoff,
-    ).group_by(ProductVendorPrice.product_id).subquery()
+    # One pass over the 60-day window, splitting it into the two 30-day halves
+    is_recent = ProductVendorPrice.invoice_date >= recent_cutoff
+    recent_vol = func.sum(case((is_recent, ProductVendorPrice.quantity)))
+    prev_vol = func.sum(case((~is_recent, ProductVendorPrice.quantity)))
+
+    # +/-10% against the previous 30 days; no (or zero) volume on either side is "stable"
+    has_both = (recent_vol != 0) & (prev_vol != 0)
+    trend = case(
+        (has_both & (recent_vol > prev_vol * 1.1), 'up'),
+        (has_both & (recent_vol < prev_vol * 0.9), 'down'),
+        else_='stable',
+    )
 
     rows = db.query(
         Product.id,
         Product.name,
-        recent.c.recent_vol,
-        previous.c.prev_vol,
-    ).join(recent, recent.c.product_id == Product.id
-    ).outerjoin(previous, previous.c.product_id == Product.id
-    ).order_by(desc(recent.c.recent_vol)).limit(limit).all()
+        recent_vol.label('recent_vol'),
+        prev_vol.label('prev_vol'),
+        trend.label('trend'),
+    ).join(ProductVendorPrice, ProductVendorPrice.product_id == Product.id
+    ).filter(ProductVendorPrice.invoice_date >= prev_cutoff
+    ).group_by(Product.id
+    ).having(func.max(ProductVendorPrice.invoice_date) >= recent_cutoff
+    ).order_by(desc('recent_vol')).limit(limit).all()
 
-    return [
+    return JSONResponse([
         {
             "id": r.id,
             "name": r.name,
             "recent_volume": float(r.recent_vol) if r.recent_vol else 0,
             "previous_volume": float(r.prev_vol) if r.prev_vol else 0,
-            "trend": "up" if r.prev_vol and r.recent_vol and float(r.recent_vol) > float(r.prev_vol) * 1.1
-                     else "down" if r.prev_vol and r.recent_vol and float(r.recent_vol) < float(r.prev_vol) * 0.9
-                     else "stable",
+            "trend": r.trend,
         }
         for r in rows
-    ]
+    ])
 
 @app.get("/api/analytics/vendor-comparison")
 def vendor_comparison(db: Session = Depends(get_db)):
     """Vendor performance comparison."""
+    return JSONResponse(_cached_response("vendor_comparison", lambda: _vendor_comparison(db)))
+
+
+def _vendor_comparison(db: Session):
     cutoff = date.today() - timedelta(days=90)
 
-    rows = db.query(
-        Vendor.id,
-        Vendor.name,
-        func.count(func.distinct(Invoice.id)).label('invoice_count'),
+    # Aggregate invoices and price rows separately: joining both to vendors at once
+    # multiplies them together and inflated total_spend by the price-row count.
+    invoice_stats = db.query(
+        Invoice.vendor_id,
+        func.count(Invoice.id).label('invoice_count'),
         func.sum(Invoice.total).label('total_spend'),
+    ).filter(
+        Invoice.invoice_date >= cutoff,
+    ).group_by(Invoice.vendor_id).subquery()
+
+    price_stats = db.query(
+        ProductVendorPrice.vendor_id,
         func.count(func.distinct(ProductVendorPrice.product_id)).label('product_count'),
         func.avg(ProductVendorPrice.unit_price).label('avg_unit_price'),
-    ).outerjoin(Invoice, (Invoice.vendor_id == Vendor.id) & (Invoice.invoice_date >= cutoff)
-    ).outerjoin(ProductVendorPrice, (ProductVendorPrice.vendor_id == Vendor.id) & (ProductVendorPrice.invoice_date >= cutoff)
+    ).filter(
+        ProductVendorPrice.invoice_date >= cutoff,
+    ).group_by(ProductVendorPrice.vendor_id).subquery()
+
+    rows = db.query(
+        Vendor.id,
+        Vendor.name,
+        invoice_stats.c.invoice_count,
+        invoice_stats.c.total_spend,
+        price_stats.c.product_count,
+        price_stats.c.avg_unit_price,
+    ).outerjoin(invoice_stats, invoice_stats.c.vendor_id == Vendor.id
+    ).outerjoin(price_stats, price_stats.c.vendor_id == Vendor.id
     ).filter(Vendor.is_active == True
-    ).group_by(Vendor.id).order_by(desc(func.sum(Invoice.total))).all()
+    ).order_by(desc(invoice_stats.c.total_spend)).all()
 
     return [
         {
@@ -1129,7 +1421,7 @@ def spending_by_product(limit: int = 20, db: Session = Depends(get_db)):
     ).order_by(desc(func.sum(ProductVendorPrice.unit_price * ProductVendorPrice.quantity))
     ).limit(limit).all()
 
-    return [
+    return JSONResponse([
         {
             "id": r.id,
             "name": r.name,
@@ -1137,23 +1429,26 @@ def spending_by_product(limit: int = 20, db: Session = Depends(get_db)):
             "total_quantity": float(r.total_quantity) if r.total_quantity else 0,
         }
         for r in rows
-    ]
+    ])
 
 @app.get("/api/analytics/price-alerts-summary")
 def price_alerts_summary(db: Session = Depends(get_db)):
     """Unacknowledged alerts with context."""
-    alerts = db.query(PriceAlert).filter(
+    # Product/vendor names come from the same query instead of two lookups per alert
+    alerts = db.query(
+        PriceAlert, Product.name.label('product_name'), Vendor.name.label('vendor_name')
+    ).outerjoin(Product, Product.id == PriceAlert.product_id
+    ).outerjoin(Vendor, Vendor.id == PriceAlert.vendor_id
+    ).filter(
         PriceAlert.is_acknowledged == False
     ).order_by(PriceAlert.created_at.desc()).limit(20).all()
 
     result = []
-    for alert in alerts:
-        product = db.query(Product).get(alert.product_id) if alert.product_id else None
-        vendor = db.query(Vendor).get(alert.vendor_id) if alert.vendor_id else None
+    for alert, product_name, vendor_name in alerts:
         result.append({
             "id": alert.id,
-            "product_name": product.name if product else "Unknown",
-            "vendor_name": vendor.name if vendor else "Unknown",
+            "product_name": product_name if product_name is not None else "Unknown",
+            "vendor_name": vendor_name if vendor_name is not None else "Unknown",
             "previous_price": float(alert.previous_price) if alert.previous_price else None,
             "new_price": float(alert.new_price) if alert.new_price else None,
             "change_percent": float(alert.change_percent) if alert.change_percent else None,
@@ -1167,19 +1462,24 @@ def price_alerts_summary(db: Session = Depends(get_db)):
 # ==================== BACKFILL ENDPOINT (Phase 3) ====================
 
 @app.post("/api/admin/backfill-price-data")
-def backfill_price_data(db: Session = Depends(get_db)):
+def backfill_price_data(db: Session = Depends(get_write_db)):
     """Backfill product_vendor_prices from existing invoice data."""
     existing_count = db.query(ProductVendorPrice).count()
     if existing_count > 0:
         return {"message": f"Already have {existing_count} price records. Skipping backfill."}
 
-    invoices = db.query(Invoice).all()
-    count = 0
+    invoices = db.query(Invoice).options(selectinload(Invoice.items)).all()
+
+    # One product lookup table instead of a SELECT per line item (first match wins, as before)
+    products = {}
+    for product in db.query(Product).order_by(Product.id):
+        products.setdefault(product.normalized_name, product)
 
+    entries = []  # (product, price row) - product ids are only known after the flush
     for invoice in invoices:
         for item in invoice.items:
             normalized = item.product_name.lower().strip()
-            product = db.query(Product).filter(Product.normalized_name == normalized).first()
+            product = products.get(normalized)
 
             if not product:
                 product = Product(
@@ -1191,41 +1491,32 @@ def backfill_price_data(db: Session = Depends(get_db)):
                     max_price=float(item.unit_price),
                 )
                 db.add(product)
-                db.flush()
-
-            pvp = ProductVendorPrice(
-                product_id=product.id,
-                vendor_id=invoice.vendor_id,
-                invoice_item_id=item.id,
-                invoice_date=invoice.invoice_date,
-                unit_price=float(item.unit_price),
-                quantity=float(item.quantity) if item.quantity else 1,
-                unit=item.unit,
-            )
-            db.add(pvp)
-            count += 1
+                products[normalized] = product
+
+            entries.append((product, {
+                "vendor_id": invoice.vendor_id,
+                "invoice_item_id": item.id,
+                "invoice_date": invoice.invoice_date,
+                "unit_price": float(item.unit_price),
+                "quantity": float(item.quantity) if item.quantity else 1,
+                "unit": item.unit,
+            }))
+    db.flush()
 
-    # Update product avg prices
-    for product in db.query(Product).all():
-        prices = db.query(ProductVendorPrice.unit_price).filter(
-            ProductVendorPrice.product_id == product.id
-        ).all()
-        if prices:
-            price_vals = [float(p[0]) for p in prices]
-            product.avg_price = sum(price_vals) / len(price_vals)
-            product.min_price = min(price_vals)
-            product.max_price = max(price_vals)
-            # Update price_history JSON
-            history = db.query(
-                ProductVendorPrice.invoice_date,
-                ProductVendorPrice.unit_price,
-                ProductVendorPrice.vendor_id,
-            ).filter(ProductVendorPrice.product_id == product.id
-            ).order_by(ProductVendorPrice.invoice_date).all()
-            product.price_history = [
-                {"date": h.invoice_date.isoformat(), "price": float(h.unit_price), "vendor_id": h.vendor_id}
-                for h in history
-            ]
+    rows = [{**row, "product_id": product.id} for product, row in entries]
+    if rows:
+        db.execute(insert(ProductVendorPrice), rows)
+    count = len(rows)
+
+    # Update product avg prices from the rows just inserted (the table was empty)
+    rows_by_product = defaultdict(list)
+    for product, row in entries:
+        rows_by_product[product].append(row)
+    for product, product_rows in rows_by_product.items():
+        price_vals = [row["unit_price"] for row in product_rows]
+        product.avg_price = sum(price_vals) / len(price_vals)
+        product.min_price = min(price_vals)
+        product.max_price = max(price_vals)
 
     db.commit()
     return {"message": f"Backfilled {count} price records"}
@@ -1249,7 +1540,7 @@ def list_sales(
     return [s.to_dict() for s in sales]
 
 @app.post("/api/sales")
-def create_sales(sales: DailySalesCreate, db: Session = Depends(get_db)):
+def create_sales(sales: DailySalesCreate, db: Session = Depends(get_write_db)):
     existing = db.query(DailySales).filter(DailySales.sale_date == sales.sale_date).first()
     if existing:
         for key, value in sales.dict().items():
@@ -1280,7 +1571,7 @@ def list_alerts(
     return alerts
 
 @app.put("/api/alerts/{alert_id}/acknowledge")
-def acknowledge_alert(alert_id: int, db: Session = Depends(get_db)):
+def acknowledge_alert(alert_id: int, db: Session = Depends(get_write_db)):
     alert = db.query(PriceAlert).filter(PriceAlert.id == alert_id).first()
     if not alert:
         raise HTTPException(status_code=404, detail="Alert not found")
@@ -1308,7 +1599,7 @@ def list_competitors(db: Session = Depends(get_db)):
     ]
 
 @app.post("/api/competitors")
-def create_competitor(store: CompetitorStoreCreate, db: Session = Depends(get_db)):
+def create_competitor(store: CompetitorStoreCreate, db: Session = Depends(get_write_db)):
     db_store = CompetitorStore(
         name=store.name,
         website_url=store.website_url,
@@ -1327,12 +1618,15 @@ def create_competitor(store: CompetitorStoreCreate, db: Session = Depends(get_db
 
 @app.post("/api/competitors/{store_id}/scrape")
 async def trigger_scrape(store_id: int, db: Session = Depends(get_db)):
-    store = db.query(CompetitorStore).filter(CompetitorStore.id == store_id).first()
+    # Async for the scrape's HTTP calls; keep the blocking lookup off the event loop
+    store = await run_in_threadpool(
+        db.query(CompetitorStore).filter(CompetitorStore.id == store_id).first
+    )
     if not store:
         raise HTTPException(status_code=404, detail="Store not found")
 
     from scraper import run_scraper
-    count = await run_scraper(store, db)
+    count = await run_scraper(store, WriteSessionLocal)
     return {"message": f"Scraped {count} prices from {store.name}"}
 
 @app.get("/api/competitors/prices")
@@ -1363,7 +1657,7 @@ def competitor_prices(
     ]
 
 @app.post("/api/competitors/prices/manual")
-def add_manual_competitor_price(entry: ManualCompetitorPriceCreate, db: Session = Depends(get_db)):
+def add_manual_competitor_price(entry: ManualCompetitorPriceCreate, db: Session = Depends(get_write_db)):
     store = db.query(CompetitorStore).filter(CompetitorStore.id == entry.store_id).first()
     if not store:
         raise HTTPException(status_code=404, detail="Store not found")
@@ -1404,32 +1698,38 @@ def add_manual_competitor_price(entry: ManualCompetitorPriceCreate, db: Session
 @app.get("/api/analytics/savings-opportunities")
 def savings_opportunities(db: Session = Depends(get_db)):
     """Products where competitors are cheaper."""
-    competitor_prices_q = db.query(CompetitorPrice).filter(
+    return _cached_response("savings_opportunities", lambda: _savings_opportunities(db))
+
+
+def _savings_opportunities(db: Session):
+    # One joined query; the database drops prices that aren't cheaper than ours
+    rows = db.query(
+        Product.id, Product.name, Product.last_price, CompetitorPrice.price, CompetitorStore.name,
+    ).join(Product, Product.id == CompetitorPrice.matched_product_id
+    ).outerjoin(CompetitorStore, CompetitorStore.id == CompetitorPrice.store_id
+    ).filter(
         CompetitorPrice.is_current == True,
-        CompetitorPrice.matched_product_id != None,
-    ).all()
+        Product.last_price != None,
+        Product.last_price != 0,
+        CompetitorPrice.price < Product.last_price,
+    ).order_by(CompetitorPrice.id).all()
 
     opportunities = []
-    for cp in competitor_prices_q:
-        product = db.query(Product).get(cp.matched_product_id)
-        if not product or not product.last_price:
-            continue
-
-        our_price = float(product.last_price)
-        their_price = float(cp.price)
+    for product_id, product_name, last_price, price, store_name in rows:
+        our_price = float(last_price)
+        their_price = float(price)
 
         if their_price >= our_price:
             continue
 
         savings_pct = ((our_price - their_price) / our_price) * 100
-        store = db.query(CompetitorStore).get(cp.store_id)
 
         opportunities.append({
-            "product_id": product.id,
-            "product_name": product.name,
+            "product_id": product_id,
+            "product_name": product_name,
             "our_price": our_price,
             "competitor_price": their_price,
-            "competitor_store": store.name if store else "Unknown",
+            "competitor_store": store_name if store_name is not None else "Unknown",
             "savings_percent": round(savings_pct, 1),
             "savings_amount": round(our_price - their_price, 2),
         })
@@ -1470,7 +1770,7 @@ def get_recommendations(db: Session = Depends(get_db)):
     ]
 
 @app.post("/api/recommendations/generate")
-def generate_recommendations(db: Session = Depends(get_db)):
+def generate_recommendations(db: Session = Depends(get_write_db)):
     """Trigger recommendation generation."""
     from recommendations import RecommendationEngine
     engine = RecommendationEngine(db)
@@ -1478,7 +1778,7 @@ def generate_recommendations(db: Session = Depends(get_db)):
     return {"message": f"Generated {count} new recommendations"}
 
 @app.put("/api/recommendations/{rec_id}/dismiss")
-def dismiss_recommendation(rec_id: int, db: Session = Depends(get_db)):
+def dismiss_recommendation(rec_id: int, db: Session = Depends(get_write_db)):
     rec = db.query(Recommendation).filter(Recommendation.id == rec_id).first()
     if not rec:
         raise HTTPException(status_code=404, detail="Recommendation not found")
@@ -1488,7 +1788,7 @@ def dismiss_recommendation(rec_id: int, db: Session = Depends(get_db)):
     return {"message": "Recommendation dismissed"}
 
 @app.put("/api/recommendations/{rec_id}/acted")
-def acted_on_recommendation(rec_id: int, db: Session = Depends(get_db)):
+def acted_on_recommendation(rec_id: int, db: Session = Depends(get_write_db)):
     rec = db.query(Recommendation).filter(Recommendation.id == rec_id).first()
     if not rec:
         raise HTTPException(status_code=404, detail="Recommendation not found")
@@ -1501,18 +1801,25 @@ def acted_on_recommendation(rec_id: int, db: Session = Depends(get_db)):
 # ==================== SHORTAGE & DELIVERY TRACKING ====================
 
 @app.put("/api/invoices/{invoice_id}/shortages")
-def update_shortages(invoice_id: int, data: ShortageUpdate, db: Session = Depends(get_db)):
+def update_shortages(invoice_id: int, data: ShortageUpdate, db: Session = Depends(get_write_db)):
     """Mark received quantities for invoice items to track shortages."""
     invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
 
+    # Load every referenced item in one query; the changes flush as one batched UPDATE
+    item_ids = [entry.get('item_id') for entry in data.items]
+    items = {
+        item.id: item
+        for item in db.query(InvoiceItem).filter(
+            InvoiceItem.id.in_(item_ids),
+            InvoiceItem.invoice_id == invoice_id,
+        )
+    }
+
     total_shortage_value = 0
     for entry in data.items:
-        item = db.query(InvoiceItem).filter(
-            InvoiceItem.id == entry.get('item_id'),
-            InvoiceItem.invoice_id == invoice_id,
-        ).first()
+        item = items.get(entry.get('item_id'))
         if not item:
             continue
         received = entry.get('received_quantity', float(item.quantity))
@@ -1533,7 +1840,11 @@ def update_shortages(invoice_id: int, data: ShortageUpdate, db: Session = Depend
 @app.get("/api/invoices/shortages")
 def list_shortages(db: Session = Depends(get_db)):
     """List all invoices with shortages."""
-    invoices = db.query(Invoice).filter(
+    # Items for all listed invoices in one extra IN query, not one per invoice
+    invoices = db.query(Invoice).options(
+        selectinload(Invoice.items), joinedload(Invoice.vendor).joinedload(Vendor.category),
+        undefer(Invoice.item_count)
+    ).filter(
         Invoice.has_shortage == True
     ).order_by(Invoice.invoice_date.desc()).all()
 
@@ -1550,7 +1861,7 @@ def list_shortages(db: Session = Depends(get_db)):
 # ==================== DISPUTE TRACKING ====================
 
 @app.post("/api/invoices/dispute")
-def create_dispute(data: DisputeCreate, db: Session = Depends(get_db)):
+def create_dispute(data: DisputeCreate, db: Session = Depends(get_write_db)):
     """Mark an invoice as disputed."""
     invoice = db.query(Invoice).filter(Invoice.id == data.invoice_id).first()
     if not invoice:
@@ -1560,20 +1871,17 @@ def create_dispute(data: DisputeCreate, db: Session = Depends(get_db)):
     invoice.dispute_reason = data.reason
     invoice.dispute_status = 'open'
 
-    for item_id in data.item_ids:
-        item = db.query(InvoiceItem).filter(
-            InvoiceItem.id == item_id,
+    if data.item_ids:
+        db.query(InvoiceItem).filter(
+            InvoiceItem.id.in_(data.item_ids),
             InvoiceItem.invoice_id == data.invoice_id,
-        ).first()
-        if item:
-            item.is_disputed = True
-            item.dispute_reason = data.reason
+        ).update({InvoiceItem.is_disputed: True, InvoiceItem.dispute_reason: data.reason})
 
     db.commit()
     return {"message": "Invoice disputed", "invoice": invoice.to_dict(include_items=True)}
 
 @app.put("/api/invoices/{invoice_id}/dispute/resolve")
-def resolve_dispute(invoice_id: int, credit_amount: float = 0, db: Session = Depends(get_db)):
+def resolve_dispute(invoice_id: int, credit_amount: float = 0, db: Session = Depends(get_write_db)):
     """Resolve a dispute, optionally with a credit amount."""
     invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
     if not invoice:
@@ -1589,7 +1897,9 @@ def resolve_dispute(invoice_id: int, credit_amount: float = 0, db: Session = Dep
 @app.get("/api/disputes")
 def list_disputes(db: Session = Depends(get_db)):
     """List all open disputes."""
-    invoices = db.query(Invoice).filter(
+    invoices = db.query(Invoice).options(
+        joinedload(Invoice.vendor).joinedload(Vendor.category), undefer(Invoice.item_count)
+    ).filter(
         Invoice.dispute_status == 'open'
     ).order_by(Invoice.created_at.desc()).all()
     return [inv.to_dict() for inv in invoices]
@@ -1597,51 +1907,84 @@ def list_disputes(db: Session = Depends(get_db)):
 
 # ==================== CSV EXPORT ====================
 
+EXPORT_CHUNK_ROWS = 500
+
+
+def _iter_csv(header: list, rows):
+    """Encode rows as CSV, yielding a chunk every EXPORT_CHUNK_ROWS rows."""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(header)
+    for i, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if i % EXPORT_CHUNK_ROWS == 0:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
+    yield output.getvalue()
+
+
 @app.get("/api/export/invoices")
 def export_invoices_csv(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    db: Session = Depends(get_db)
 ):
     """Export invoices as CSV for accounting software."""
-    query = db.query(Invoice).join(Vendor)
-    if start_date:
-        query = query.filter(Invoice.invoice_date >= start_date)
-    if end_date:
-        query = query.filter(Invoice.invoice_date <= end_date)
-
-    invoices = query.order_by(Invoice.invoice_date).all()
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow([
+    def rows():
+        # Streamed after the endpoint returns, so the generator owns its session
+        db = SessionLocal()
+        try:
+            # Plain column rows: no ORM objects or per-vendor category loads
+            query = db.query(
+                Invoice.invoice_date,
+                Vendor.name.label('vendor_name'),
+                Category.name.label('category_name'),
+                Invoice.invoice_number,
+                Invoice.status,
+                Invoice.subtotal,
+                Invoice.tax,
+                Invoice.total,
+                Invoice.due_date,
+                Invoice.payment_date,
+                Invoice.has_shortage,
+                Invoice.shortage_total,
+                Invoice.dispute_status,
+                Invoice.credit_amount,
+            ).join(Vendor, Vendor.id == Invoice.vendor_id
+            ).outerjoin(Category, Category.id == Vendor.category_id)
+            if start_date:
+                query = query.filter(Invoice.invoice_date >= start_date)
+            if end_date:
+                query = query.filter(Invoice.invoice_date <= end_date)
+
+            for inv in query.order_by(Invoice.invoice_date).yield_per(EXPORT_CHUNK_ROWS):
+                yield [
+                    inv.invoice_date.isoformat() if inv.invoice_date else '',
+                    inv.vendor_name,
+                    inv.category_name or '',
+                    inv.invoice_number or '',
+                    inv.status,
+                    float(inv.subtotal) if inv.subtotal else '',
+                    float(inv.tax) if inv.tax else 0,
+                    float(inv.total) if inv.total else 0,
+                    inv.due_date.isoformat() if inv.due_date else '',
+                    inv.payment_date.isoformat() if inv.payment_date else '',
+                    'Yes' if inv.has_shortage else 'No',
+                    float(inv.shortage_total) if inv.shortage_total else 0,
+                    inv.dispute_status or '',
+                    float(inv.credit_amount) if inv.credit_amount else 0,
+                ]
+        finally:
+            db.close()
+
+    header = [
         'Invoice Date', 'Vendor', 'Category', 'Invoice #', 'Status',
         'Subtotal', 'Tax', 'Total', 'Due Date', 'Payment Date',
         'Has Shortage', 'Shortage Amount', 'Dispute Status', 'Credit Amount'
-    ])
-
-    for inv in invoices:
-        writer.writerow([
-            inv.invoice_date.isoformat() if inv.invoice_date else '',
-            inv.vendor.name if inv.vendor else '',
-            inv.vendor.category.name if inv.vendor and inv.vendor.category else '',
-            inv.invoice_number or '',
-            inv.status,
-            float(inv.subtotal) if inv.subtotal else '',
-            float(inv.tax) if inv.tax else 0,
-            float(inv.total) if inv.total else 0,
-            inv.due_date.isoformat() if inv.due_date else '',
-            inv.payment_date.isoformat() if inv.payment_date else '',
-            'Yes' if inv.has_shortage else 'No',
-            float(inv.shortage_total) if inv.shortage_total else 0,
-            inv.dispute_status or '',
-            float(inv.credit_amount) if inv.credit_amount else 0,
-        ])
-
-    output.seek(0)
+    ]
     filename = f"invoices_{date.today().isoformat()}.csv"
     return StreamingResponse(
-        io.BytesIO(output.getvalue().encode()),
+        _iter_csv(header, rows()),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -1650,47 +1993,56 @@ def export_invoices_csv(
 def export_line_items_csv(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-    db: Session = Depends(get_db)
 ):
     """Export all line items as CSV."""
-    query = db.query(InvoiceItem).join(Invoice).join(Vendor)
-    if start_date:
-        query = query.filter(Invoice.invoice_date >= start_date)
-    if end_date:
-        query = query.filter(Invoice.invoice_date <= end_date)
-
-    items = query.order_by(Invoice.invoice_date).all()
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow([
+    def rows():
+        db = SessionLocal()
+        try:
+            query = db.query(
+                Invoice.invoice_date,
+                Vendor.name.label('vendor_name'),
+                Invoice.invoice_number,
+                InvoiceItem.product_name,
+                InvoiceItem.product_code,
+                InvoiceItem.quantity,
+                InvoiceItem.received_quantity,
+                InvoiceItem.unit,
+                InvoiceItem.unit_price,
+                InvoiceItem.total_price,
+            ).join(Invoice, Invoice.id == InvoiceItem.invoice_id
+            ).join(Vendor, Vendor.id == Invoice.vendor_id)
+            if start_date:
+                query = query.filter(Invoice.invoice_date >= start_date)
+            if end_date:
+                query = query.filter(Invoice.invoice_date <= end_date)
+
+            for item in query.order_by(Invoice.invoice_date).yield_per(EXPORT_CHUNK_ROWS):
+                shortage = 0
+                if item.received_quantity is not None and item.quantity:
+                    shortage = max(0, float(item.quantity) - float(item.received_quantity))
+                yield [
+                    item.invoice_date.isoformat() if item.invoice_date else '',
+                    item.vendor_name,
+                    item.invoice_number or '',
+                    item.product_name,
+                    item.product_code or '',
+                    float(item.quantity) if item.quantity else 0,
+                    float(item.received_quantity) if item.received_quantity is not None else '',
+                    shortage,
+                    item.unit or '',
+                    float(item.unit_price) if item.unit_price else 0,
+                    float(item.total_price) if item.total_price else 0,
+                ]
+        finally:
+            db.close()
+
+    header = [
         'Date', 'Vendor', 'Invoice #', 'Product', 'Product Code',
         'Quantity', 'Received Qty', 'Shortage', 'Unit', 'Unit Price', 'Total Price'
-    ])
-
-    for item in items:
-        inv = item.invoice
-        shortage = 0
-        if item.received_quantity is not None and item.quantity:
-            shortage = max(0, float(item.quantity) - float(item.received_quantity))
-        writer.writerow([
-            inv.invoice_date.isoformat() if inv.invoice_date else '',
-            inv.vendor.name if inv.vendor else '',
-            inv.invoice_number or '',
-            item.product_name,
-            item.product_code or '',
-            float(item.quantity) if item.quantity else 0,
-            float(item.received_quantity) if item.received_quantity is not None else '',
-            shortage,
-            item.unit or '',
-            float(item.unit_price) if item.unit_price else 0,
-            float(item.total_price) if item.total_price else 0,
-        ])
-
-    output.seek(0)
+    ]
     filename = f"line_items_{date.today().isoformat()}.csv"
     return StreamingResponse(
-        io.BytesIO(output.getvalue().encode()),
+        _iter_csv(header, rows()),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -1701,30 +2053,36 @@ def export_line_items_csv(
 @app.get("/api/payments/due")
 def payments_due(db: Session = Depends(get_db)):
     """Invoices with upcoming or overdue payment due dates."""
-    unpaid = db.query(Invoice).filter(
+    unpaid = db.query(Invoice).options(
+        joinedload(Invoice.vendor).joinedload(Vendor.category), undefer(Invoice.item_count)
+    ).filter(
         Invoice.status.in_(['pending', 'verified']),
         Invoice.due_date != None,
     ).order_by(Invoice.due_date).all()
 
     today = date.today()
+    week_end = today + timedelta(days=7)
     overdue = []
     due_this_week = []
     due_later = []
+    overdue_total = week_total = later_total = 0
 
+    # Bucket and total in the same pass over the rows
     for inv in unpaid:
         entry = {
             **inv.to_dict(),
             "days_until_due": (inv.due_date - today).days,
         }
+        amount = float(inv.total)
         if inv.due_date < today:
             overdue.append(entry)
-        elif inv.due_date <= today + timedelta(days=7):
+            overdue_total += amount
+        elif inv.due_date <= week_end:
             due_this_week.append(entry)
+            week_total += amount
         else:
             due_later.append(entry)
-
-    overdue_total = sum(float(inv.total) for inv in unpaid if inv.due_date and inv.due_date < today)
-    week_total = sum(float(inv.total) for inv in unpaid if inv.due_date and today <= inv.due_date <= today + timedelta(days=7))
+            later_total += amount
 
     return {
         "overdue": overdue,
@@ -1732,7 +2090,7 @@ def payments_due(db: Session = Depends(get_db)):
         "due_this_week": due_this_week,
         "due_this_week_total": week_total,
         "due_later": due_later,
-        "total_outstanding": sum(float(inv.total) for inv in unpaid),
+        "total_outstanding": overdue_total + week_total + later_total,
     }
 
 @app.get("/api/analytics/cash-flow")
@@ -1741,30 +2099,38 @@ def cash_flow_forecast(days: int = 30, db: Session = Depends(get_db)):
     today = date.today()
     end = today + timedelta(days=days)
 
-    unpaid = db.query(Invoice).filter(
+    # One row per due date and vendor; weeks are folded together below
+    daily = db.query(
+        Invoice.due_date,
+        Vendor.name.label('vendor_name'),
+        func.sum(Invoice.total).label('total'),
+        func.count(Invoice.id).label('count'),
+    ).outerjoin(Vendor, Vendor.id == Invoice.vendor_id
+    ).filter(
         Invoice.status.in_(['pending', 'verified']),
         Invoice.due_date != None,
         Invoice.due_date >= today,
         Invoice.due_date <= end,
-    ).order_by(Invoice.due_date).all()
+    ).group_by(Invoice.due_date, Vendor.id, Vendor.name
+    ).order_by(Invoice.due_date, func.min(Invoice.id)).all()
 
     # Group by week
     weeks = {}
-    for inv in unpaid:
-        week_start = inv.due_date - timedelta(days=inv.due_date.weekday())
+    for row in daily:
+        week_start = row.due_date - timedelta(days=row.due_date.weekday())
         week_key = week_start.isoformat()
         if week_key not in weeks:
             weeks[week_key] = {"week_start": week_key, "total": 0, "count": 0, "vendors": []}
-        weeks[week_key]["total"] += float(inv.total)
-        weeks[week_key]["count"] += 1
-        vname = inv.vendor.name if inv.vendor else "Unknown"
+        weeks[week_key]["total"] += float(row.total)
+        weeks[week_key]["count"] += row.count
+        vname = row.vendor_name if row.vendor_name is not None else "Unknown"
         if vname not in weeks[week_key]["vendors"]:
             weeks[week_key]["vendors"].append(vname)
 
     return {
         "forecast_days": days,
-        "total_due": sum(float(inv.total) for inv in unpaid),
-        "invoice_count": len(unpaid),
+        "total_due": sum(week["total"] for week in weeks.values()),
+        "invoice_count": sum(week["count"] for week in weeks.values()),
         "by_week": list(weeks.values()),
     }
 
@@ -1780,46 +2146,58 @@ def vendor_scorecard(vendor_id: int, db: Session = Depends(get_db)):
 
     cutoff = date.today() - timedelta(days=180)
 
-    # Invoice stats
-    invoices = db.query(Invoice).filter(
-        Invoice.vendor_id == vendor_id,
-        Invoice.invoice_date >= cutoff,
-    ).all()
-
-    total_invoices = len(invoices)
-    total_spent = sum(float(inv.total) for inv in invoices)
-    disputed_count = sum(1 for inv in invoices if inv.dispute_status)
-    shortage_count = sum(1 for inv in invoices if inv.has_shortage)
-
-    # Price stability: how many price alerts for this vendor
+    # All counters in one round-trip: invoice aggregates over this vendor's
+    # recent invoices, with the other tables as uncorrelated scalar subqueries
     alert_count = db.query(func.count(PriceAlert.id)).filter(
         PriceAlert.vendor_id == vendor_id,
         PriceAlert.created_at >= cutoff,
-    ).scalar() or 0
+    ).scalar_subquery()
 
     increase_count = db.query(func.count(PriceAlert.id)).filter(
         PriceAlert.vendor_id == vendor_id,
         PriceAlert.alert_type == 'increase',
         PriceAlert.created_at >= cutoff,
-    ).scalar() or 0
+    ).scalar_subquery()
 
-    # Product count
     product_count = db.query(func.count(func.distinct(ProductVendorPrice.product_id))).filter(
         ProductVendorPrice.vendor_id == vendor_id,
-    ).scalar() or 0
+    ).scalar_subquery()
+
+    active_contracts = db.query(func.count(PriceContract.id)).filter(
+        PriceContract.vendor_id == vendor_id,
+        PriceContract.is_active == True,
+        PriceContract.end_date >= date.today(),
+    ).scalar_subquery()
+
+    disputed = (Invoice.dispute_status != None) & (Invoice.dispute_status != '')
+    stats = db.query(
+        func.count(Invoice.id).label('total_invoices'),
+        func.sum(Invoice.total).label('total_spent'),
+        func.sum(case((disputed, 1), else_=0)).label('disputed_count'),
+        func.sum(case((Invoice.has_shortage == True, 1), else_=0)).label('shortage_count'),
+        alert_count.label('alert_count'),
+        increase_count.label('increase_count'),
+        product_count.label('product_count'),
+        active_contracts.label('active_contracts'),
+    ).filter(
+        Invoice.vendor_id == vendor_id,
+        Invoice.invoice_date >= cutoff,
+    ).one()
+
+    total_invoices = stats.total_invoices
+    total_spent = float(stats.total_spent) if stats.total_spent is not None else 0
+    disputed_count = stats.disputed_count or 0
+    shortage_count = stats.shortage_count or 0
+    alert_count = stats.alert_count or 0
+    increase_count = stats.increase_count or 0
+    product_count = stats.product_count or 0
+    active_contracts = stats.active_contracts or 0
 
     # Scores (0-100)
     reliability_score = max(0, 100 - (shortage_count * 15) - (disputed_count * 20))
     price_stability_score = max(0, 100 - (increase_count * 10))
     overall_score = (reliability_score + price_stability_score) // 2
 
-    # Active contracts
-    active_contracts = db.query(PriceContract).filter(
-        PriceContract.vendor_id == vendor_id,
-        PriceContract.is_active == True,
-        PriceContract.end_date >= date.today(),
-    ).count()
-
     return {
         "vendor": vendor.to_dict(),
         "period_days": 180,
@@ -1842,7 +2220,7 @@ def vendor_scorecard(vendor_id: int, db: Session = Depends(get_db)):
 # ==================== PROFIT MARGIN TRACKING ====================
 
 @app.put("/api/products/{product_id}/sell-price")
-def update_sell_price(product_id: int, data: ProductSellPriceUpdate, db: Session = Depends(get_db)):
+def update_sell_price(product_id: int, data: ProductSellPriceUpdate, db: Session = Depends(get_write_db)):
     """Set the retail sell price for a product to calculate margins."""
     product = db.query(Product).filter(Product.id == product_id).first()
     if not product:
@@ -1860,7 +2238,15 @@ def update_sell_price(product_id: int, data: ProductSellPriceUpdate, db: Session
 @app.get("/api/analytics/margins")
 def profit_margins(db: Session = Depends(get_db)):
     """Products with sell price set, showing buy/sell/margin."""
-    products = db.query(Product).filter(
+    # Only the pricing columns; full Product rows would also decode price_history
+    products = db.query(
+        Product.id,
+        Product.name,
+        Product.last_price,
+        Product.sell_price,
+        Product.units_per_case,
+        Product.target_margin,
+    ).filter(
         Product.sell_price != None,
         Product.last_price != None,
     ).all()
@@ -1887,7 +2273,7 @@ def profit_margins(db: Session = Depends(get_db)):
         })
 
     result.sort(key=lambda x: x['margin_percent'])
-    return result
+    return JSONResponse(result)
 
 
 # ==================== PRICE CONTRACTS ====================
@@ -1895,41 +2281,49 @@ def profit_margins(db: Session = Depends(get_db)):
 @app.get("/api/contracts")
 def list_contracts(active_only: bool = True, db: Session = Depends(get_db)):
     """List price contracts."""
-    query = db.query(PriceContract)
+    today = date.today()
+
+    # Flag contracts whose product's current price runs over the agreed price
+    is_violated = case(
+        (Product.last_price > PriceContract.agreed_price * 1.01, True),
+        else_=False,
+    )
+    query = db.query(
+        PriceContract.id,
+        Vendor.name.label('vendor_name'),
+        Product.name.label('product_name'),
+        PriceContract.agreed_price,
+        Product.last_price,
+        PriceContract.start_date,
+        PriceContract.end_date,
+        PriceContract.notes,
+        is_violated.label('is_violated'),
+    ).outerjoin(Product, Product.id == PriceContract.product_id
+    ).outerjoin(Vendor, Vendor.id == PriceContract.vendor_id)
     if active_only:
         query = query.filter(
             PriceContract.is_active == True,
-            PriceContract.end_date >= date.today(),
+            PriceContract.end_date >= today,
         )
 
-    contracts = query.order_by(PriceContract.end_date).all()
-    result = []
-    for c in contracts:
-        product = db.query(Product).get(c.product_id)
-        vendor = db.query(Vendor).get(c.vendor_id)
-        days_left = (c.end_date - date.today()).days
-
-        # Check if current price exceeds contract
-        violation = False
-        if product and product.last_price:
-            violation = float(product.last_price) > float(c.agreed_price) * 1.01
-
-        result.append({
+    return JSONResponse([
+        {
             "id": c.id,
-            "vendor_name": vendor.name if vendor else "Unknown",
-            "product_name": product.name if product else "Unknown",
+            "vendor_name": c.vendor_name if c.vendor_name is not None else "Unknown",
+            "product_name": c.product_name if c.product_name is not None else "Unknown",
             "agreed_price": float(c.agreed_price),
-            "current_price": float(product.last_price) if product and product.last_price else None,
+            "current_price": float(c.last_price) if c.last_price else None,
             "start_date": c.start_date.isoformat(),
             "end_date": c.end_date.isoformat(),
-            "days_left": days_left,
-            "is_violated": violation,
+            "days_left": (c.end_date - today).days,
+            "is_violated": c.is_violated,
             "notes": c.notes,
-        })
-    return result
+        }
+        for c in query.order_by(PriceContract.end_date).all()
+    ])
 
 @app.post("/api/contracts")
-def create_contract(data: PriceContractCreate, db: Session = Depends(get_db)):
+def create_contract(data: PriceContractCreate, db: Session = Depends(get_write_db)):
     """Create a new price contract."""
     contract = PriceContract(
         vendor_id=data.vendor_id,
@@ -1945,7 +2339,7 @@ def create_contract(data: PriceContractCreate, db: Session = Depends(get_db)):
     return {"id": contract.id, "message": "Contract created"}
 
 @app.delete("/api/contracts/{contract_id}")
-def delete_contract(contract_id: int, db: Session = Depends(get_db)):
+def delete_contract(contract_id: int, db: Session = Depends(get_write_db)):
     contract = db.query(PriceContract).filter(PriceContract.id == contract_id).first()
     if not contract:
         raise HTTPException(status_code=404, detail="Contract not found")
@@ -1957,7 +2351,7 @@ def delete_contract(contract_id: int, db: Session = Depends(get_db)):
 # ==================== OCR LEARNING / CORRECTIONS ====================
 
 @app.post("/api/ocr/corrections")
-def save_ocr_correction(data: OCRCorrectionCreate, db: Session = Depends(get_db)):
+def save_ocr_correction(data: OCRCorrectionCreate, db: Session = Depends(get_write_db)):
     """Save a correction mapping so OCR can auto-fix in the future."""
     existing = db.query(OCRCorrection).filter(
         OCRCorrection.original_text == data.original_text,
@@ -1977,6 +2371,7 @@ def save_ocr_correction(data: OCRCorrectionCreate, db: Session = Depends(get_db)
         db.add(correction)
 
     db.commit()
+    invalidate_ocr_corrections_cache()
     return {"message": "Correction saved"}
 
 @app.get("/api/ocr/corrections")
@@ -1995,21 +2390,42 @@ def list_ocr_corrections(db: Session = Depends(get_db)):
     ]
 
 @app.delete("/api/ocr/corrections/{correction_id}")
-def delete_ocr_correction(correction_id: int, db: Session = Depends(get_db)):
+def delete_ocr_correction(correction_id: int, db: Session = Depends(get_write_db)):
     correction = db.query(OCRCorrection).filter(OCRCorrection.id == correction_id).first()
     if not correction:
         raise HTTPException(status_code=404, detail="Correction not found")
     db.delete(correction)
     db.commit()
+    invalidate_ocr_corrections_cache()
     return {"message": "Correction deleted"}
 
 
+# Product-name corrections, reloaded after writes here or every few minutes
+# (so edits made through another worker process are picked up too)
+OCR_CORRECTIONS_TTL = 300  # seconds
+_ocr_correction_map: Optional[dict] = None
+_ocr_corrections_loaded_at = 0.0
+
+
+def _get_ocr_correction_map(db: Session) -> dict:
+    global _ocr_correction_map, _ocr_corrections_loaded_at
+    if _ocr_correction_map is None or time.monotonic() - _ocr_corrections_loaded_at > OCR_CORRECTIONS_TTL:
+        corrections = db.query(OCRCorrection.original_text, OCRCorrection.corrected_text).filter(
+            OCRCorrection.field_type == 'product_name'
+        ).all()
+        _ocr_correction_map = {original.lower(): corrected for original, corrected in corrections}
+        _ocr_corrections_loaded_at = time.monotonic()
+    return _ocr_correction_map
+
+
+def invalidate_ocr_corrections_cache():
+    global _ocr_correction_map
+    _ocr_correction_map = None
+
+
 def apply_ocr_corrections(db: Session, line_items: list) -> list:
     """Apply saved corrections to OCR output."""
-    corrections = db.query(OCRCorrection).filter(
-        OCRCorrection.field_type == 'product_name'
-    ).all()
-    correction_map = {c.original_text.lower(): c.corrected_text for c in corrections}
+    correction_map = _get_ocr_correction_map(db)
 
     for item in line_items:
         name_lower = item.get('product_name', '').lower()
@@ -2023,13 +2439,15 @@ def apply_ocr_corrections(db: Session, line_items: list) -> list:
 @app.get("/api/analytics/dead-stock")
 def dead_stock(days_threshold: int = 45, db: Session = Depends(get_db)):
     """Products you used to buy regularly but haven't ordered recently."""
-    cutoff = date.today() - timedelta(days=days_threshold)
-    older_cutoff = date.today() - timedelta(days=days_threshold * 3)
+    today = date.today()
+    cutoff = today - timedelta(days=days_threshold)
+    older_cutoff = today - timedelta(days=days_threshold * 3)
 
     # Products with purchases in the older period but NOT in the recent period
-    recent_products = db.query(func.distinct(ProductVendorPrice.product_id)).filter(
+    # (anti-join against the recent ids, read off idx_pvp_date_product)
+    recent_products = db.query(ProductVendorPrice.product_id).filter(
         ProductVendorPrice.invoice_date >= cutoff,
-    ).subquery()
+    ).distinct().subquery()
 
     historical = db.query(
         Product.id,
@@ -2038,25 +2456,26 @@ def dead_stock(days_threshold: int = 45, db: Session = Depends(get_db)):
         func.count(ProductVendorPrice.id).label('total_purchases'),
         func.sum(ProductVendorPrice.quantity).label('total_quantity'),
     ).join(ProductVendorPrice, ProductVendorPrice.product_id == Product.id
+    ).outerjoin(recent_products, recent_products.c.product_id == Product.id
     ).filter(
         ProductVendorPrice.invoice_date >= older_cutoff,
         ProductVendorPrice.invoice_date < cutoff,
-        ~Product.id.in_(recent_products),
+        recent_products.c.product_id == None,
     ).group_by(Product.id
     ).having(func.count(ProductVendorPrice.id) >= 2  # Must have bought at least twice before
     ).order_by(desc(func.count(ProductVendorPrice.id))).all()
 
-    return [
+    return JSONResponse([
         {
             "id": r.id,
             "name": r.name,
-            "last_ordered": r.last_ordered.isoformat() if r.last_ordered else None,
-            "days_since_last_order": (date.today() - r.last_ordered).days if r.last_ordered else None,
+            "last_ordered": r.last_ordered.isoformat(),
+            "days_since_last_order": (today - r.last_ordered).days,
             "total_purchases": r.total_purchases,
             "total_quantity": float(r.total_quantity) if r.total_quantity else 0,
         }
         for r in historical
-    ]
+    ])
 
 
 # ==================== REORDER SUGGESTIONS ====================
@@ -2064,48 +2483,46 @@ def dead_stock(days_threshold: int = 45, db: Session = Depends(get_db)):
 @app.get("/api/analytics/reorder-suggestions")
 def reorder_suggestions(db: Session = Depends(get_db)):
     """Suggest products that may need reordering based on purchase frequency."""
-    # Get products with enough purchase history
-    products = db.query(Product).filter(Product.last_ordered_date != None).all()
-    suggestions = []
-
-    for product in products:
-        # Calculate average order frequency
-        purchases = db.query(ProductVendorPrice.invoice_date).filter(
-            ProductVendorPrice.product_id == product.id,
-        ).order_by(ProductVendorPrice.invoice_date).all()
+    # Purchase span per product; the mean gap between n sorted dates is (max - min) / (n - 1)
+    history = db.query(
+        ProductVendorPrice.product_id,
+        func.count(ProductVendorPrice.id).label('purchases'),
+        func.min(ProductVendorPrice.invoice_date).label('first_date'),
+        func.max(ProductVendorPrice.invoice_date).label('last_date'),
+    ).group_by(ProductVendorPrice.product_id
+    ).having(func.count(ProductVendorPrice.id) >= 3).subquery()
 
-        if len(purchases) < 3:
-            continue
+    rows = db.query(
+        Product, history.c.purchases, history.c.first_date, history.c.last_date,
+        Vendor.name.label('last_vendor_name'),
+    ).join(history, history.c.product_id == Product.id
+    ).outerjoin(Vendor, Vendor.id == Product.last_vendor_id
+    ).filter(Product.last_ordered_date != None).all()
+    suggestions = []
 
-        dates = [p.invoice_date for p in purchases]
-        intervals = [(dates[i+1] - dates[i]).days for i in range(len(dates)-1)]
-        avg_interval = sum(intervals) / len(intervals) if intervals else 0
+    for product, purchases, first_date, last_date, last_vendor_name in rows:
+        avg_interval = (last_date - first_date).days / (purchases - 1)
 
         if avg_interval <= 0:
             continue
 
-        # Update stored frequency
-        product.reorder_frequency_days = int(avg_interval)
-
         days_since = (date.today() - product.last_ordered_date).days if product.last_ordered_date else 999
         days_overdue = days_since - avg_interval
 
         if days_overdue > -3:  # Due within 3 days or overdue
-            last_vendor = db.query(Vendor).get(product.last_vendor_id) if product.last_vendor_id else None
             suggestions.append({
                 "product_id": product.id,
                 "product_name": product.name,
                 "avg_order_interval_days": int(avg_interval),
                 "days_since_last_order": days_since,
                 "days_overdue": max(0, int(days_overdue)),
-                "last_vendor": last_vendor.name if last_vendor else None,
+                "last_vendor": last_vendor_name,
                 "last_price": float(product.last_price) if product.last_price else None,
                 "urgency": "overdue" if days_overdue > 3 else "due_soon" if days_overdue > -3 else "ok",
             })
 
-    db.commit()
     suggestions.sort(key=lambda x: x['days_overdue'], reverse=True)
-    return suggestions
+    return JSONResponse(suggestions)
 
 
 # ==================== SEASONAL PRICE PATTERNS ====================
@@ -2113,6 +2530,10 @@ def reorder_suggestions(db: Session = Depends(get_db)):
 @app.get("/api/analytics/seasonal/{product_id}")
 def seasonal_patterns(product_id: int, db: Session = Depends(get_db)):
     """Show average price by month for a product to reveal seasonal patterns."""
+    return JSONResponse(_cached_response(f"seasonal:{product_id}", lambda: _seasonal_patterns(product_id, db)))
+
+
+def _seasonal_patterns(product_id: int, db: Session):
     rows = db.query(
         extract('month', ProductVendorPrice.invoice_date).label('month'),
         func.avg(ProductVendorPrice.unit_price).label('avg_price'),
@@ -2156,12 +2577,20 @@ def get_invoice_image(invoice_id: int, db: Session = Depends(get_db)):
 
 def _update_product_catalog(
     db: Session, item: InvoiceItemCreate, vendor_id: int,
-    invoice_date: date, invoice_item_id: int = None
+    invoice_date: date, invoice_item_id: int = None,
+    *, products: dict, contracts: dict,
 ):
-    """Update product catalog with new price data and insert into product_vendor_prices."""
+    """
+    Update product catalog with new price data and insert into product_vendor_prices.
+    Returns the Product, which is still pending (no id) if it was created here.
+
+    products (normalized name -> Product) and contracts (product id -> the
+    vendor's active PriceContract) are lookups preloaded once per invoice;
+    products is extended with any product created here.
+    """
     normalized = item.product_name.lower().strip()
 
-    product = db.query(Product).filter(Product.normalized_name == normalized).first()
+    product = products.get(normalized)
 
     if product:
         old_price = float(product.last_price) if product.last_price else None
@@ -2171,7 +2600,7 @@ def _update_product_catalog(
         if old_price and abs(old_price - new_price) / old_price > 0.05:
             change_pct = ((new_price - old_price) / old_price) * 100
             alert = PriceAlert(
-                product_id=product.id,
+                product=product,
                 invoice_item_id=invoice_item_id,
                 vendor_id=vendor_id,
                 previous_price=old_price,
@@ -2191,18 +2620,8 @@ def _update_product_catalog(
         if not product.max_price or new_price > float(product.max_price):
             product.max_price = new_price
 
-        # Update price_history JSON
-        history = product.price_history or []
-        history.append({
-            "date": invoice_date.isoformat(),
-            "price": new_price,
-            "vendor_id": vendor_id,
-        })
-        product.price_history = history
-
-        # Recalculate avg_price
-        prices = [float(h["price"]) for h in history]
-        product.avg_price = sum(prices) / len(prices)
+        # avg_price is refreshed from product_vendor_prices by the caller
+        # (see _refresh_avg_prices) once all of the invoice's rows are in
 
     else:
         # Auto-categorize new product
@@ -2222,27 +2641,18 @@ def _update_product_catalog(
             min_price=item.unit_price,
             max_price=item.unit_price,
             last_ordered_date=invoice_date,
-            price_history=[{
-                "date": invoice_date.isoformat(),
-                "price": item.unit_price,
-                "vendor_id": vendor_id,
-            }],
         )
+        # Inserted with the invoice's other new products at the caller's flush;
+        # the rows below reference it through relationships until then
         db.add(product)
-        db.flush()
+        products[normalized] = product
 
-    # Check for price contract violations
-    active_contract = db.query(PriceContract).filter(
-        PriceContract.vendor_id == vendor_id,
-        PriceContract.product_id == product.id,
-        PriceContract.is_active == True,
-        PriceContract.start_date <= invoice_date,
-        PriceContract.end_date >= invoice_date,
-    ).first()
+    # Check for price contract violations (a new product has no id, so no contract)
+    active_contract = contracts.get(product.id)
 
     if active_contract and item.unit_price > float(active_contract.agreed_price) * 1.01:
         alert = PriceAlert(
-            product_id=product.id,
+            product=product,
             invoice_item_id=invoice_item_id,
             vendor_id=vendor_id,
             previous_price=float(active_contract.agreed_price),
@@ -2258,7 +2668,7 @@ def _update_product_catalog(
 
     # Insert into product_vendor_prices
     pvp = ProductVendorPrice(
-        product_id=product.id,
+        product=product,
         vendor_id=vendor_id,
         invoice_item_id=invoice_item_id,
         invoice_date=invoice_date,
@@ -2267,6 +2677,20 @@ def _update_product_catalog(
         unit=item.unit,
     )
     db.add(pvp)
+    return product
+
+
+def _refresh_avg_prices(db: Session, product_ids):
+    """Recompute avg_price from product_vendor_prices for the given products in one UPDATE."""
+    if not product_ids:
+        return
+    avg_price = select(func.avg(ProductVendorPrice.unit_price)).where(
+        ProductVendorPrice.product_id == Product.id
+    ).scalar_subquery()
+    db.execute(
+        update(Product).where(Product.id.in_(product_ids)).values(avg_price=avg_price),
+        execution_options={"synchronize_session": False},
+    )
 
 
 # ==================== DELI MODULE ====================
@@ -2296,7 +2720,7 @@ def list_deli_inventory(db: Session = Depends(get_db)):
     return [item.to_dict() for item in items]
 
 @app.post("/api/deli/inventory")
-def add_deli_item(data: DeliItemCreate, db: Session = Depends(get_db)):
+def add_deli_item(data: DeliItemCreate, db: Session = Depends(get_write_db)):
     item = DeliInventory(
         product_id=data.product_id,
         product_name=data.product_name,
@@ -2311,7 +2735,7 @@ def add_deli_item(data: DeliItemCreate, db: Session = Depends(get_db)):
     return item.to_dict()
 
 @app.put("/api/deli/inventory/{item_id}")
-def update_deli_item(item_id: int, data: DeliItemUpdate, db: Session = Depends(get_db)):
+def update_deli_item(item_id: int, data: DeliItemUpdate, db: Session = Depends(get_write_db)):
     item = db.query(DeliInventory).filter(DeliInventory.id == item_id).first()
     if not item:
         raise HTTPException(status_code=404, detail="Deli item not found")
@@ -2325,7 +2749,7 @@ def update_deli_item(item_id: int, data: DeliItemUpdate, db: Session = Depends(g
     return item.to_dict()
 
 @app.delete("/api/deli/inventory/{item_id}")
-def delete_deli_item(item_id: int, db: Session = Depends(get_db)):
+def delete_deli_item(item_id: int, db: Session = Depends(get_write_db)):
     item = db.query(DeliInventory).filter(DeliInventory.id == item_id).first()
     if not item:
         raise HTTPException(status_code=404, detail="Deli item not found")
@@ -2336,11 +2760,13 @@ def delete_deli_item(item_id: int, db: Session = Depends(get_db)):
 @app.get("/api/deli/vendors")
 def list_deli_vendors(db: Session = Depends(get_db)):
     """List vendors flagged as deli vendors."""
-    vendors = db.query(Vendor).filter(Vendor.is_deli_vendor == True, Vendor.is_active == True).all()
+    vendors = db.query(Vendor).options(joinedload(Vendor.category)).filter(
+        Vendor.is_deli_vendor == True, Vendor.is_active == True
+    ).all()
     return [v.to_dict() for v in vendors]
 
 @app.put("/api/vendors/{vendor_id}/deli-flag")
-def toggle_deli_vendor(vendor_id: int, is_deli: bool = True, db: Session = Depends(get_db)):
+def toggle_deli_vendor(vendor_id: int, is_deli: bool = True, db: Session = Depends(get_write_db)):
     vendor = db.query(Vendor).filter(Vendor.id == vendor_id).first()
     if not vendor:
         raise HTTPException(status_code=404, detail="Vendor not found")
@@ -2378,11 +2804,11 @@ def generate_order_sheet(vendor_id: int, db: Session = Depends(get_db)):
 @app.get("/api/deli/delivery-schedule")
 def list_delivery_schedules(db: Session = Depends(get_db)):
     """List delivery schedules for deli vendors."""
-    schedules = db.query(VendorDeliverySchedule).all()
+    schedules = db.query(VendorDeliverySchedule).options(joinedload(VendorDeliverySchedule.vendor)).all()
     return [s.to_dict() for s in schedules]
 
 @app.post("/api/deli/delivery-schedule")
-def create_delivery_schedule(data: DeliveryScheduleCreate, db: Session = Depends(get_db)):
+def create_delivery_schedule(data: DeliveryScheduleCreate, db: Session = Depends(get_write_db)):
     schedule = VendorDeliverySchedule(
         vendor_id=data.vendor_id,
         delivery_days=data.delivery_days,
@@ -2406,6 +2832,10 @@ def run_migration(db: Session = Depends(get_db)):
             with engine.connect() as conn:
                 conn.execute(text("ALTER TABLE vendors ADD COLUMN is_deli_vendor BOOLEAN DEFAULT FALSE"))
                 conn.commit()
+        # create_all() skips indexes on tables that already exist
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=engine, checkfirst=True)
         return {"message": "Migration complete"}
     except Exception as e:
         return {"message": f"Migration note: {e}"}
@@ -2418,12 +2848,11 @@ def manual_backup():
     """Create a manual database backup."""
     if "sqlite" not in DATABASE_URL:
         return {"message": "Backup only available for SQLite"}
-    db_path = Path("./purchase_tracker.db")
-    if not db_path.exists() or db_path.stat().st_size == 0:
+    if not SQLITE_DB_PATH.exists() or SQLITE_DB_PATH.stat().st_size == 0:
         raise HTTPException(status_code=400, detail="No database to back up")
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     backup_path = BACKUP_DIR / f"purchase_tracker_{timestamp}.db"
-    shutil.copy2(str(db_path), str(backup_path))
+    _snapshot_database(backup_path)
     backups = sorted(BACKUP_DIR.glob("purchase_tracker_*.db"))
     return {
         "message": f"Backup created: {backup_path.name}",
@@ -2443,8 +2872,8 @@ def list_backups():
 # ==================== SEED DATA ====================
 
 @app.post("/api/seed")
-def seed_database(db: Session = Depends(get_db)):
-    if db.query(Category).count() > 0:
+def seed_database(db: Session = Depends(get_write_db)):
+    if db.query(db.query(Category).exists()).scalar():
         return {"message": "Database already seeded"}
 
     categories = [
@@ -2465,6 +2894,7 @@ def seed_database(db: Session = Depends(get_db)):
     for cat in categories:
         db.add(cat)
     db.commit()
+    invalidate_category_cache()
 
     deli_cat = db.query(Category).filter(Category.name == "Deli/Specialty").first()
 
@@ -2483,43 +2913,103 @@ def seed_database(db: Session = Depends(get_db)):
 
 # ==================== STARTUP ====================
 
+SQLITE_OPTIMIZE_INTERVAL = 900  # seconds
+
+
+def _optimize_sqlite():
+    with engine.connect() as conn:
+        conn.execute(text("PRAGMA optimize"))
+
+
+async def _sqlite_optimize_loop():
+    """Refresh SQLite query planner statistics periodically."""
+    while True:
+        await asyncio.sleep(SQLITE_OPTIMIZE_INTERVAL)
+        try:
+            await run_in_threadpool(_optimize_sqlite)
+        except Exception as e:
+            print(f"PRAGMA optimize error: {e}")
+
+
+async def _backup_loop():
+    """Snapshot the SQLite database periodically."""
+    while True:
+        await asyncio.sleep(BACKUP_INTERVAL)
+        try:
+            await run_in_threadpool(_backup_database)
+        except Exception as e:
+            print(f"Database backup error: {e}")
+
+
 @app.on_event("startup")
 async def startup_event():
-    db = SessionLocal()
+    if "sqlite" in DATABASE_URL:
+        await run_in_threadpool(_backup_database, startup=True)
+
+    db = WriteSessionLocal()
     try:
-        if db.query(Category).count() == 0:
-            seed_database(db)
+        seed_database(db)  # no-op once any category exists
     finally:
         db.close()
 
+    if "sqlite" in DATABASE_URL:
+        app.state.sqlite_optimize_task = asyncio.create_task(_sqlite_optimize_loop())
+        app.state.backup_task = asyncio.create_task(_backup_loop())
+
 
 # ==================== FRONTEND ROUTES ====================
 
+_frontend_cache: dict = {}
+
+
+def _frontend_response(request: Request, name: str, media_type: str) -> Optional[Response]:
+    """
+    Serve a frontend shell file from memory (reloaded when its mtime changes),
+    answering a matching If-None-Match with 304. None if the file is missing.
+    """
+    path = FRONTEND_DIR / name
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError:
+        return None
+    cached = _frontend_cache.get(name)
+    if cached is None or cached[0] != mtime:
+        body = path.read_bytes()
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        cached = (mtime, body, etag)
+        _frontend_cache[name] = cached
+
+    _, body, etag = cached
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type=media_type, headers=headers)
+
+
 @app.get("/manifest.json")
-async def serve_manifest():
-    manifest_path = FRONTEND_DIR / "manifest.json"
-    if manifest_path.exists():
-        return FileResponse(str(manifest_path), media_type="application/json")
+async def serve_manifest(request: Request):
+    response = _frontend_response(request, "manifest.json", "application/json")
+    if response is not None:
+        return response
     raise HTTPException(status_code=404)
 
 @app.get("/")
-async def serve_index():
-    index_path = FRONTEND_DIR / "index.html"
-    if index_path.exists():
-        return FileResponse(str(index_path))
+async def serve_index(request: Request):
+    response = _frontend_response(request, "index.html", "text/html")
+    if response is not None:
+        return response
     return {"message": "Apple Tree Purchase Tracker API v2.1"}
 
 @app.get("/{path:path}")
-async def catch_all(path: str):
+async def catch_all(path: str, request: Request):
     """SPA catch-all: serve index.html for non-API, non-static routes."""
     if path.startswith("api/") or path.startswith("uploads/") or path.startswith("static/"):
         raise HTTPException(status_code=404)
-    index_path = FRONTEND_DIR / "index.html"
-    if index_path.exists():
-        return FileResponse(str(index_path))
+    response = _frontend_response(request, "index.html", "text/html")
+    if response is not None:
+        return response
     raise HTTPException(status_code=404)
 
-
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -7,9 +7,9 @@ from decimal import Decimal
 from typing import Optional, List
 from sqlalchemy import (
     Column, Integer, String, Text, Numeric, Boolean,
-    Date, DateTime, ForeignKey, UniqueConstraint, JSON, Index, Float
+    Date, DateTime, ForeignKey, UniqueConstraint, JSON, Index, Float, select
 )
-from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy.orm import relationship, declarative_base, column_property
 from sqlalchemy.sql import func
 
 Base = declarative_base()
@@ -32,6 +32,9 @@ class Category(Base):
 
 class Vendor(Base):
     __tablename__ = 'vendors'
+    __table_args__ = (
+        Index('idx_vendors_category', 'category_id'),
+    )
 
     id = Column(Integer, primary_key=True)
     name = Column(String(255), nullable=False)
@@ -73,6 +76,11 @@ class Invoice(Base):
     __tablename__ = 'invoices'
     __table_args__ = (
         UniqueConstraint('vendor_id', 'invoice_number', name='uq_vendor_invoice'),
+        # Covers the date-window sums (spending trend, category breakdown) index-only
+        Index('idx_invoices_date_vendor_total', 'invoice_date', 'vendor_id', 'total'),
+        Index('idx_invoices_vendor_date', 'vendor_id', 'invoice_date'),
+        Index('idx_invoices_status_date', 'status', 'invoice_date'),
+        Index('idx_invoices_status_due', 'status', 'due_date'),
     )
 
     id = Column(Integer, primary_key=True)
@@ -114,7 +122,7 @@ class Invoice(Base):
             'due_date': self.due_date.isoformat() if self.due_date else None,
             'total': float(self.total) if self.total else 0,
             'status': self.status,
-            'item_count': len(self.items) if self.items else 0,
+            'item_count': self.item_count or 0,
             'has_shortage': self.has_shortage or False,
             'shortage_total': float(self.shortage_total) if self.shortage_total else 0,
             'dispute_status': self.dispute_status,
@@ -146,6 +154,10 @@ class InvoiceItem(Base):
 
     invoice = relationship("Invoice", back_populates="items")
 
+    __table_args__ = (
+        Index('idx_invoice_items_invoice', invoice_id),
+    )
+
     def to_dict(self):
         shortage = 0
         if self.received_quantity is not None and self.quantity:
@@ -165,6 +177,17 @@ class InvoiceItem(Base):
         }
 
 
+# Counted in SQL so Invoice.to_dict doesn't have to load the items collection.
+# Deferred: listings that serialize invoices undefer it; other queries skip the subquery.
+Invoice.item_count = column_property(
+    select(func.count(InvoiceItem.id))
+    .where(InvoiceItem.invoice_id == Invoice.id)
+    .correlate_except(InvoiceItem)
+    .scalar_subquery(),
+    deferred=True,
+)
+
+
 class Product(Base):
     __tablename__ = 'products'
 
@@ -181,7 +204,7 @@ class Product(Base):
     sell_price = Column(Numeric(10, 2))  # Retail shelf price
     units_per_case = Column(Integer)  # How many units in a case
     target_margin = Column(Numeric(5, 2))  # Target profit margin %
-    price_history = Column(JSON)
+    price_history = Column(JSON)  # No longer written; history is in product_vendor_prices
     reorder_frequency_days = Column(Integer)  # Avg days between orders
     last_ordered_date = Column(Date)
     created_at = Column(DateTime, default=func.now())
@@ -191,6 +214,7 @@ class Product(Base):
 
     __table_args__ = (
         Index('idx_products_normalized', normalized_name),
+        Index('idx_products_category', category_id),
     )
 
 
@@ -214,6 +238,8 @@ class ProductVendorPrice(Base):
     __table_args__ = (
         Index('idx_pvp_product_date', product_id, invoice_date),
         Index('idx_pvp_vendor_product', vendor_id, product_id),
+        Index('idx_pvp_vendor_date', vendor_id, invoice_date),
+        Index('idx_pvp_date_product', invoice_date, product_id),
     )
 
 
@@ -276,6 +302,12 @@ class PriceAlert(Base):
     acknowledged_at = Column(DateTime)
     created_at = Column(DateTime, default=func.now())
 
+    product = relationship("Product")
+
+    __table_args__ = (
+        Index('idx_price_alerts_vendor_created', vendor_id, created_at),
+    )
+
 
 class AuditLog(Base):
     __tablename__ = 'audit_log'
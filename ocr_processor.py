@@ -8,11 +8,11 @@ import json
 import base64
 from datetime import datetime
 from typing import Optional, List, Dict, Any
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
 from pathlib import Path
 
 
-@dataclass
+@dataclass(slots=True)
 class ExtractedLineItem:
     line_number: int
     product_name: str
@@ -24,7 +24,7 @@ class ExtractedLineItem:
     confidence: float = 1.0
 
 
-@dataclass
+@dataclass(slots=True)
 class ExtractedInvoice:
     vendor_name: Optional[str] = None
     vendor_address: Optional[str] = None
@@ -46,11 +46,19 @@ class ExtractedInvoice:
             self.line_items = []
 
     def to_dict(self) -> Dict[str, Any]:
-        result = asdict(self)
-        result['line_items'] = [asdict(item) for item in self.line_items]
+        # Shallow copies are enough for JSON output; asdict() deep-copies every field
+        result = {f.name: getattr(self, f.name) for f in fields(self)}
+        result['line_items'] = [
+            {f.name: getattr(item, f.name) for f in fields(item)}
+            for item in self.line_items
+        ]
         return result
 
 
+# Retries (exponential backoff, honours retry-after) on 429/5xx from the API
+OCR_MAX_RETRIES = int(os.getenv("OCR_MAX_RETRIES", "4"))
+
+
 VISION_PROMPT = """You are an expert invoice data extractor. Analyze this invoice image and extract all structured data.
 
 Return ONLY valid JSON with this exact structure:
@@ -96,6 +104,14 @@ class InvoiceOCRProcessor:
 
     def __init__(self):
         self.api_key = os.getenv("ANTHROPIC_API_KEY")
+        self._client = None
+
+    def _get_client(self):
+        """Create the API client once so its HTTP connections are reused."""
+        if self._client is None:
+            import anthropic
+            self._client = anthropic.Anthropic(api_key=self.api_key, max_retries=OCR_MAX_RETRIES)
+        return self._client
 
     def process_image(self, image_path: str) -> ExtractedInvoice:
         """
@@ -135,9 +151,7 @@ class InvoiceOCRProcessor:
             return ExtractedInvoice(confidence_score=0.0)
 
         try:
-            import anthropic
-
-            client = anthropic.Anthropic(api_key=self.api_key)
+            client = self._get_client()
 
             content_blocks = []
             content_blocks.append({
@@ -192,9 +206,7 @@ class InvoiceOCRProcessor:
             return ExtractedInvoice(confidence_score=0.0)
 
         try:
-            import anthropic
-
-            client = anthropic.Anthropic(api_key=self.api_key)
+            client = self._get_client()
             image_b64 = base64.b64encode(image_bytes).decode('utf-8')
             media_type = self._get_media_type(suffix)
 
@@ -4,10 +4,10 @@ Scrapes competitor store websites for price comparison data.
 """
 
 import re
-import time
 import random
+import asyncio
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
 from difflib import SequenceMatcher
 from abc import ABC, abstractmethod
 
@@ -21,12 +21,17 @@ USER_AGENTS = [
     "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/120.0.0.0 Safari/537.36",
 ]
 
+# Precompiled patterns used on every scraped product
+_PUNCTUATION_RE = re.compile(r'[^\w\s]')
+_WHITESPACE_RE = re.compile(r'\s+')
+_PRICE_RE = re.compile(r'[\d,]+\.?\d*')
+
 
 def normalize_product_name(name: str) -> str:
     """Normalize a product name for fuzzy matching."""
     name = name.lower().strip()
-    name = re.sub(r'[^\w\s]', '', name)
-    name = re.sub(r'\s+', ' ', name)
+    name = _PUNCTUATION_RE.sub('', name)
+    name = _WHITESPACE_RE.sub(' ', name)
     return name
 
 
@@ -109,7 +114,7 @@ class GenericWebScraper(PriceScraper):
                     price_text = price_el.get_text(strip=True)
 
                     # Extract numeric price
-                    price_match = re.search(r'[\d,]+\.?\d*', price_text.replace(',', ''))
+                    price_match = _PRICE_RE.search(price_text.replace(',', ''))
                     if not price_match:
                         continue
 
@@ -127,7 +132,7 @@ class GenericWebScraper(PriceScraper):
                     })
 
                     # Rate limiting
-                    time.sleep(random.uniform(0.1, 0.3))
+                    await asyncio.sleep(random.uniform(0.1, 0.3))
 
         except Exception as e:
             print(f"Scrape error for {self.store.name}: {e}")
@@ -154,9 +159,10 @@ def get_scraper(store: CompetitorStore) -> PriceScraper:
     return scraper_class(store)
 
 
-async def run_scraper(store: CompetitorStore, db: Session):
+async def run_scraper(store: CompetitorStore, session_factory: Callable[[], Session]):
     """
     Run the scraper for a given store and save results to the database.
+    session_factory opens the session used for the save (the app's write session).
     """
     scraper = get_scraper(store)
     results = await scraper.scrape()
@@ -164,33 +170,47 @@ async def run_scraper(store: CompetitorStore, db: Session):
     if not results:
         return 0
 
-    # Load all products for fuzzy matching
-    products = db.query(Product).all()
-
-    # Mark old prices as not current
-    db.query(CompetitorPrice).filter(
-        CompetitorPrice.store_id == store.id,
-        CompetitorPrice.is_current == True
-    ).update({CompetitorPrice.is_current: False})
-
-    count = 0
-    for item in results:
-        normalized = normalize_product_name(item['product_name'])
-        matched = fuzzy_match_product(item['product_name'], products)
-
-        price = CompetitorPrice(
-            store_id=store.id,
-            product_name=item['product_name'],
-            normalized_name=normalized,
-            matched_product_id=matched.id if matched else None,
-            price=item['price'],
-            unit=item.get('unit'),
-            is_current=True,
-        )
-        db.add(price)
-        count += 1
-
-    store.last_scraped_at = datetime.now()
-    db.commit()
-
-    return count
+    # Matching and saving are blocking DB work; run them off the event loop
+    return await asyncio.to_thread(_save_scrape_results, store.id, results, session_factory)
+
+
+def _save_scrape_results(
+    store_id: int, results: List[Dict[str, Any]], session_factory: Callable[[], Session]
+) -> int:
+    """Fuzzy-match scraped items to products and store them as current prices."""
+    db = session_factory()
+    try:
+        store = db.get(CompetitorStore, store_id)
+
+        # Load all products for fuzzy matching
+        products = db.query(Product).all()
+
+        # Mark old prices as not current
+        db.query(CompetitorPrice).filter(
+            CompetitorPrice.store_id == store.id,
+            CompetitorPrice.is_current == True
+        ).update({CompetitorPrice.is_current: False})
+
+        count = 0
+        for item in results:
+            normalized = normalize_product_name(item['product_name'])
+            matched = fuzzy_match_product(item['product_name'], products)
+
+            price = CompetitorPrice(
+                store_id=store.id,
+                product_name=item['product_name'],
+                normalized_name=normalized,
+                matched_product_id=matched.id if matched else None,
+                price=item['price'],
+                unit=item.get('unit'),
+                is_current=True,
+            )
+            db.add(price)
+            count += 1
+
+        store.last_scraped_at = datetime.now()
+        db.commit()
+
+        return count
+    finally:
+        db.close()